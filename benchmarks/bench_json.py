@@ -0,0 +1,50 @@
+"""decoding time of the json answers with the stdlib json module and with orjson
+
+run from the root of the project:
+
+    $ python -m benchmarks.bench_json
+"""
+import argparse
+import json
+import timeit
+import typing
+
+from benchmarks.payloads import daily_payload, group_payload
+from open_weather_api.fetch_weather import _parse_forecast_daily, _parse_forecast_group
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _best_of(func: typing.Callable, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args()
+
+    backends = {'json': json.loads}
+    if orjson is not None:
+        backends['orjson'] = orjson.loads
+
+    payloads = {
+        'group of 20 cities': (json.dumps(group_payload(20)).encode(), _parse_forecast_group),
+        'group of 1000 cities': (json.dumps(group_payload(1000)).encode(), _parse_forecast_group),
+        'forecast/daily 16 days': (json.dumps(daily_payload()).encode(), _parse_forecast_daily),
+    }
+
+    print(f'{"payload":<26}{"size":>9}{"backend":>9}{"decode":>12}{"decode+parse":>15}')
+    for name, (body, parse) in payloads.items():
+        for backend, loads in backends.items():
+            decode = _best_of(lambda: loads(body), args.number)
+            decode_parse = _best_of(lambda: parse(loads(body)), args.number)
+            print(f'{name:<26}{len(body) / 1024:>7.1f}KB{backend:>9}'
+                  f'{decode * 1e6:>10.1f}us{decode_parse * 1e6:>13.1f}us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""memory used by the parsed forecasts as records compared to the plain dicts
+
+run from the root of the project:
+
+    $ python -m benchmarks.bench_records_memory
+"""
+import argparse
+import gc
+import tracemalloc
+import typing
+
+from benchmarks.payloads import daily_payload, group_payload
+from open_weather_api.fetch_weather import _parse_forecast_daily, _parse_forecast_group
+
+
+def _measure(build: typing.Callable[[], typing.Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cities', type=int, default=10000)
+    args = parser.parse_args()
+
+    group = group_payload(args.cities)
+    daily = [daily_payload(name=f'city {c_id}') for c_id in range(args.cities // 10)]
+    cases = {
+        f'group of {args.cities} cities': (
+            lambda: _parse_forecast_group(group),
+            lambda: {name: forecast.to_dict()
+                     for name, forecast in _parse_forecast_group(group).items()},
+        ),
+        f'16 days of {len(daily)} cities': (
+            lambda: [_parse_forecast_daily(payload) for payload in daily],
+            lambda: [_parse_forecast_daily(payload).to_dict() for payload in daily],
+        ),
+    }
+
+    print(f'{"case":<28}{"records":>12}{"dicts":>12}{"saved":>8}')
+    for name, (records, dicts) in cases.items():
+        records_size = _measure(records)
+        dicts_size = _measure(dicts)
+        saved = 1 - records_size / dicts_size
+        print(f'{name:<28}{records_size / 2 ** 20:>10.2f}MB{dicts_size / 2 ** 20:>10.2f}MB'
+              f'{saved:>8.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""realistic answers of the open weather api built from the recorded test fixtures"""
+import copy
+import typing
+
+from tests.test_fetch_weather import (
+    OpenWeatherResponseDaily,
+    OpenWeatherResponseGroup,
+    OpenWeatherResponseRainy,
+)
+
+
+def current_payload() -> typing.Dict:
+    return OpenWeatherResponseRainy().json()
+
+
+def group_payload(cities: int) -> typing.Dict:
+    """a group answer of cities copies of the recorded London city"""
+    template = OpenWeatherResponseGroup().json()['list'][0]
+    return {'cnt': cities,
+            'list': [dict(template, id=c_id, name=f'city {c_id}') for c_id in range(cities)]}
+
+
+def daily_payload(days: int = 16, name: str = 'London') -> typing.Dict:
+    """a forecast/daily answer of days days repeating the recorded week"""
+    payload = copy.deepcopy(OpenWeatherResponseDaily().json())
+    payload['list'] = (payload['list'] * (days // len(payload['list']) + 1))[:days]
+    payload['cnt'] = days
+    payload['city']['name'] = name
+    return payload
@@ -0,0 +1,178 @@
+"""offline benchmark suite of the fetch and parse hot paths
+
+measures the parsers on recorded payloads of growing sizes and get_city_forecast
+end to end against a local stub server at several concurrency levels. the results
+are saved as json so two runs can be compared:
+
+    $ python -m benchmarks.run --output before.json
+    $ python -m benchmarks.run --output after.json --compare before.json
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import json
+import platform
+import subprocess
+import sys
+import time
+import typing
+
+from benchmarks.payloads import current_payload, daily_payload, group_payload
+from open_weather_api import decoding
+from open_weather_api.fetch_weather import (
+    _parse_forecast_current,
+    _parse_forecast_daily,
+    _parse_forecast_group,
+    ForecastType,
+    OpenWeatherClient,
+)
+from tests.stub_server import StubOpenWeatherServer
+
+
+def _percentile(sorted_values: typing.List[float], percent: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summary(name: str, params: typing.Dict, latencies: typing.List[float],
+             elapsed: float) -> typing.Dict:
+    latencies = sorted(latencies)
+    return {
+        'name': name,
+        'params': params,
+        'calls': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'mean': sum(latencies) / len(latencies),
+        'p50': _percentile(latencies, 50),
+        'p90': _percentile(latencies, 90),
+        'p99': _percentile(latencies, 99),
+    }
+
+
+def bench_parser(name: str, parser: typing.Callable, payload: typing.Dict,
+                 params: typing.Dict, calls: int) -> typing.Dict:
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(calls):
+        call_start = time.perf_counter()
+        parser(payload)
+        latencies.append(time.perf_counter() - call_start)
+    return _summary(name, params, latencies, time.perf_counter() - start)
+
+
+def bench_end_to_end(forecast_type: ForecastType, body: bytes, city_id: typing.Any,
+                     params: typing.Dict, concurrency: int, calls: int) -> typing.Dict:
+    api = {ForecastType.CURRENT: 'weather',
+           ForecastType.DAILY_16: 'forecast/daily',
+           ForecastType.MULTIPLE: 'group'}[forecast_type]
+
+    with StubOpenWeatherServer({api: lambda query: (200, body)}) as server:
+        # every call asks for the same city, coalescing them would measure the
+        # waiting for the calls in flight instead of fetching and parsing
+        with OpenWeatherClient(base_url=server.base_url, pool_size=concurrency,
+                               coalesce=False) as client:
+            def call(_):
+                call_start = time.perf_counter()
+                client.get_city_forecast(city_id, forecast_type)
+                return time.perf_counter() - call_start
+
+            # open the pooled connections before measuring
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(call, range(concurrency)))
+                start = time.perf_counter()
+                latencies = list(executor.map(call, range(calls)))
+                elapsed = time.perf_counter() - start
+
+    return _summary(f'get_city_forecast {forecast_type.name}',
+                    dict(params, concurrency=concurrency), latencies, elapsed)
+
+
+def run(scale: float) -> typing.List[typing.Dict]:
+    def calls(count):
+        return max(10, int(count * scale))
+
+    results = [bench_parser('_parse_forecast_current', _parse_forecast_current,
+                            current_payload(), {}, calls(20000))]
+    for days in (7, 16):
+        results.append(bench_parser('_parse_forecast_daily', _parse_forecast_daily,
+                                    daily_payload(days), {'days': days}, calls(5000)))
+    for cities in (1, 20, 200, 1000):
+        results.append(bench_parser('_parse_forecast_group', _parse_forecast_group,
+                                    group_payload(cities), {'cities': cities},
+                                    calls(100000 // cities)))
+
+    cases = [
+        (ForecastType.CURRENT, current_payload(), 2643743, {}),
+        (ForecastType.DAILY_16, daily_payload(16), 2643743, {'days': 16}),
+        (ForecastType.MULTIPLE, group_payload(20), list(range(20)), {'cities': 20}),
+    ]
+    for forecast_type, payload, city_id, params in cases:
+        body = json.dumps(payload).encode()
+        for concurrency in (1, 4, 16):
+            results.append(bench_end_to_end(forecast_type, body, city_id,
+                                            dict(params, bytes=len(body)),
+                                            concurrency, calls(1000)))
+    return results
+
+
+def _git_commit() -> typing.Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _result_key(result: typing.Dict) -> str:
+    params = ','.join(f'{key}={value}' for key, value in sorted(result['params'].items())
+                      if key != 'bytes')
+    return f"{result['name']}[{params}]"
+
+
+def print_results(results: typing.List[typing.Dict],
+                  baseline: typing.Optional[typing.List[typing.Dict]] = None) -> None:
+    baseline = {_result_key(result): result for result in baseline or ()}
+    header = f'{"benchmark":<58}{"calls/s":>11}{"p50":>10}{"p90":>10}{"p99":>10}'
+    print(header + (f'{"vs base":>9}' if baseline else ''))
+    for result in results:
+        key = _result_key(result)
+        line = (f'{key:<58}{result["throughput"]:>11.0f}'
+                f'{result["p50"] * 1e6:>8.0f}us{result["p90"] * 1e6:>8.0f}us'
+                f'{result["p99"] * 1e6:>8.0f}us')
+        if key in baseline:
+            line += f'{result["throughput"] / baseline[key]["throughput"]:>8.2f}x'
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help='save the results as json to this file')
+    parser.add_argument('--compare', help='json results of a previous run to compare to')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply the number of calls of every benchmark')
+    args = parser.parse_args()
+
+    results = run(args.scale)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'commit': _git_commit(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'json_backend': decoding.BACKEND,
+            'scale': args.scale,
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+import asyncio
+import typing
+
+from open_weather_api import config
+from open_weather_api.instrumentation import CallMetrics
+from open_weather_api.singleflight import AsyncSingleFlight
+from open_weather_api.fetch_weather import (
+    _API_PARSER,
+    _build_payload,
+    _cache_key,
+    _chunk_city_ids,
+    _decode_answer,
+    _in_units,
+    _merge_chunks,
+    BulkResult,
+    ForecastType,
+    Units,
+)
+
+if typing.TYPE_CHECKING:
+    from open_weather_api.instrumentation import Instrumentation
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - depends on the installed extras
+    aiohttp = None
+
+
+class AsyncOpenWeatherClient:
+    """asyncio client for the open weather api
+
+    the connections are pooled by an aiohttp connector of pool_size connections,
+    at most max_concurrency requests are in flight at the same time and every
+    request is limited to timeout seconds. with coalesce identical calls made while
+    one of them is in flight share its result. instrumentation is an optional
+    instrumentation.Instrumentation told about every upstream call, their queue
+    phase is the wait for one of the max_concurrency slots.
+    needs the async extra installed (pip install open-weather-client[async]).
+    """
+
+    def __init__(self,
+                 api_key: typing.Optional[str] = None,
+                 base_url: typing.Optional[str] = None,
+                 pool_size: int = 100,
+                 max_concurrency: int = 20,
+                 timeout: float = 10,
+                 keepalive_timeout: float = 15,
+                 coalesce: bool = True,
+                 instrumentation: typing.Optional['Instrumentation'] = None) -> None:
+        if aiohttp is None:
+            raise ImportError('AsyncOpenWeatherClient needs aiohttp, install it with '
+                              'pip install open-weather-client[async]')
+        self._api_key = api_key
+        self._base_url = base_url
+        self._pool_size = pool_size
+        self._max_concurrency = max_concurrency
+        self._timeout = timeout
+        self._keepalive_timeout = keepalive_timeout
+        self._session = None
+        self._semaphore = None
+        self._flights = AsyncSingleFlight() if coalesce else None
+        self.instrumentation = instrumentation
+
+    @property
+    def api_key(self) -> typing.Optional[str]:
+        return self._api_key if self._api_key is not None else config.API_KEY
+
+    @property
+    def base_url(self) -> str:
+        return self._base_url if self._base_url is not None else config.BASE_URL
+
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        # the session and the semaphore are bound to the running loop so they are
+        # created on first use and not in __init__
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._pool_size,
+                                             keepalive_timeout=self._keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._session
+
+    async def close(self) -> None:
+        """close all the pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> 'AsyncOpenWeatherClient':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    @property
+    def coalesced(self) -> int:
+        """number of calls that got the result of an identical call already in flight"""
+        return self._flights.coalesced if self._flights is not None else 0
+
+    async def _fetch(self, api: str, payload: typing.Dict,
+                     call: typing.Optional[CallMetrics] = None) -> typing.Dict:
+        session = self._get_session()
+        timeout = aiohttp.ClientTimeout(total=self._timeout)
+        url = f'{self.base_url}{api}'
+        # like requests, leave out the parameters without a value (a missing api key)
+        payload = {key: value for key, value in payload.items() if value is not None}
+        async with self._semaphore:
+            if call is not None:
+                call.mark('queue')
+            async with session.get(url, params=payload, timeout=timeout) as res:
+                if call is not None:
+                    call.mark('response')
+                    call.status_code = res.status
+                    call.retries = 0
+                body = await res.read()
+
+        if call is None:
+            return _decode_answer(res.status, body)
+        call.mark('download')
+        call.response_size = len(body)
+        data = _decode_answer(res.status, body)
+        call.mark('decode')
+        return data
+
+    async def get_city_forecast(self,
+                                city_id: typing.Union[int, typing.List],
+                                forecast_type: ForecastType = ForecastType.CURRENT,
+                                units: Units = Units.METRIC) -> typing.Mapping:
+        """get the weather of city_id city for forecast_type type
+
+        like OpenWeatherClient, fetched in Units.STANDARD and converted to units
+        """
+        payload = _build_payload(city_id, forecast_type, Units.STANDARD, self.api_key)
+        if self._flights is None:
+            forecast = await self._fetch_forecast(forecast_type, payload)
+        else:
+            key = _cache_key(forecast_type, payload['id'], Units.STANDARD)
+            forecast = await self._flights.do(key, self._fetch_forecast, forecast_type, payload)
+        return _in_units(forecast, forecast_type, units)
+
+    async def _fetch_forecast(self, forecast_type: ForecastType,
+                              payload: typing.Dict) -> typing.Dict:
+        if self.instrumentation is None:
+            res = await self._fetch(_API_PARSER[forecast_type]['api'], payload)
+            return _API_PARSER[forecast_type]['parser'](res)
+
+        call = CallMetrics(forecast_type, Units[payload['units'].upper()])
+        try:
+            res = await self._fetch(_API_PARSER[forecast_type]['api'], payload, call)
+            forecast = _API_PARSER[forecast_type]['parser'](res)
+            call.mark('parse')
+            return forecast
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            self.instrumentation.on_call(call)
+
+    async def get_current(self, city_id: int, units: Units = Units.METRIC) -> typing.Mapping:
+        """get the current weather of city_id city"""
+        return await self.get_city_forecast(city_id, ForecastType.CURRENT, units)
+
+    async def get_daily(self, city_id: int, units: Units = Units.METRIC) -> typing.Mapping:
+        """get the 16 days forecast of city_id city"""
+        return await self.get_city_forecast(city_id, ForecastType.DAILY_16, units)
+
+    async def get_multiple(self, city_ids: typing.List,
+                           units: Units = Units.METRIC) -> typing.Dict:
+        """get the current weather of all the cities in city_ids"""
+        return await self.get_city_forecast(list(city_ids), ForecastType.MULTIPLE, units)
+
+    async def get_multiple_forecasts(self,
+                                     city_ids: typing.Iterable[int],
+                                     units: Units = Units.METRIC,
+                                     chunk_size: typing.Optional[int] = None) -> BulkResult:
+        """get the current weather of any number of cities
+
+        the ids are split to chunks of chunk_size (config.GROUP_MAX_IDS by default)
+        that are fetched concurrently, bounded by max_concurrency.
+        a failed chunk is reported in the failures of the result and doesn't stop
+        the other chunks.
+        """
+        chunks = _chunk_city_ids(city_ids, chunk_size)
+        results = await asyncio.gather(*(self.get_multiple(chunk, units) for chunk in chunks),
+                                       return_exceptions=True)
+
+        return _merge_chunks(chunks, results)
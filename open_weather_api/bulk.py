@@ -0,0 +1,82 @@
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+import typing
+
+from open_weather_api import decoding
+from open_weather_api.fetch_weather import (
+    _build_payload,
+    _check_cod,
+    _parse_forecast_daily,
+    BulkResult,
+    ForecastType,
+    get_default_client,
+    OpenWeatherClient,
+    Units,
+)
+from open_weather_api.rate_limit import Priority
+from open_weather_api.records import CityForecasts
+
+
+def _parse_daily_content(content: bytes) -> CityForecasts:
+    # runs in the worker processes, so only the bytes of the answer are pickled to
+    # them and not the tree of dicts of its json
+    data = decoding.loads(content)
+    _check_cod(data)
+    return _parse_forecast_daily(data)
+
+
+def fetch_daily_forecasts(city_ids: typing.Iterable[int],
+                          units: Units = Units.METRIC,
+                          client: typing.Optional[OpenWeatherClient] = None,
+                          max_workers: typing.Optional[int] = None,
+                          processes: typing.Optional[int] = None,
+                          executor: typing.Optional[Executor] = None,
+                          priority: Priority = Priority.NORMAL) -> BulkResult:
+    """fetch the 16 days forecasts of many cities, parsing them in a process pool
+
+    the answers are downloaded by max_workers threads (pool_size of the client by
+    default) and every downloaded answer is parsed right away by a pool of processes
+    (os.cpu_count() by default), so the parsing isn't bound to one core by the GIL.
+    executor is an optional process pool to use instead of creating one, to keep its
+    processes between calls.
+    forecasts of the result maps every city id to its CityForecasts in the order of
+    city_ids and failures maps the tuple of the id of every failed city to its
+    exception. the answers don't go through the cache of the client.
+    """
+    client = client or get_default_client()
+    city_ids = list(dict.fromkeys(city_ids))
+    if not city_ids:
+        return BulkResult(forecasts={}, failures={})
+
+    parsers = executor if executor is not None else ProcessPoolExecutor(max_workers=processes)
+    try:
+        # start the worker processes before the download threads, so they aren't
+        # forked while a thread holds a lock
+        parsers.submit(int).result()
+
+        def download(c_id: int) -> typing.Union[Future, Exception]:
+            try:
+                payload = _build_payload(c_id, ForecastType.DAILY_16, units, client.api_key)
+                content = client._fetch(ForecastType.DAILY_16, payload, priority, raw=True)
+            except Exception as e:
+                return e
+            return parsers.submit(_parse_daily_content, content)
+
+        workers = min(max_workers or client._pool_size, len(city_ids))
+        with ThreadPoolExecutor(max_workers=workers) as downloads:
+            results = list(downloads.map(download, city_ids))
+
+        bulk = BulkResult(forecasts={}, failures={})
+        for c_id, result in zip(city_ids, results):
+            if isinstance(result, Future):
+                try:
+                    result = result.result()
+                except Exception as e:
+                    result = e
+            if isinstance(result, Exception):
+                bulk.failures[(c_id,)] = result
+            else:
+                bulk.forecasts[c_id] = result
+        return bulk
+    finally:
+        if executor is None:
+            parsers.shutdown()
@@ -0,0 +1,244 @@
+import abc
+from collections import OrderedDict
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import typing
+
+from open_weather_api.fetch_weather import ForecastType
+
+
+DEFAULT_TTLS = {
+    ForecastType.CURRENT: 10 * 60,
+    ForecastType.DAILY_16: 3 * 60 * 60,
+    ForecastType.MULTIPLE: 10 * 60,
+}
+
+
+class CacheEntry(typing.NamedTuple):
+    value: typing.Any
+    stored_at: float
+    expires_at: float
+
+
+class CacheStats:
+    """counters of the lookups done in a cache"""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self) -> str:
+        return f'CacheStats(hits={self.hits}, misses={self.misses}, evictions={self.evictions})'
+
+
+class CacheBackend(abc.ABC):
+    """interface of the caches the client keeps its parsed forecasts in
+
+    every entry lives for the ttl of its ForecastType (DEFAULT_TTLS updated by ttls)
+    measured by clock. the cached values are shared between the callers and must
+    not be changed.
+    """
+
+    def __init__(self,
+                 ttls: typing.Optional[typing.Dict[ForecastType, float]] = None,
+                 clock: typing.Callable[[], float] = time.monotonic) -> None:
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.stats = CacheStats()
+        self._clock = clock
+
+    def ttl_for(self, forecast_type: ForecastType) -> float:
+        return self.ttls[forecast_type]
+
+    def now(self) -> float:
+        """the current time of the clock the entries are stored with"""
+        return self._clock()
+
+    @abc.abstractmethod
+    def get_entry(self, key: str) -> typing.Optional[CacheEntry]:
+        """get the entry of key even if it expired, without counting the lookup"""
+
+    @abc.abstractmethod
+    def get(self, key: str) -> typing.Any:
+        """get the value of key, None if it is missing or expired"""
+
+    @abc.abstractmethod
+    def set(self, key: str, value: typing.Any, ttl: float) -> None:
+        """store value under key for ttl seconds"""
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        """remove key from the cache"""
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        """remove all the entries"""
+
+    @abc.abstractmethod
+    def purge_expired(self) -> int:
+        """remove the expired entries and return their number"""
+
+
+class TTLCache(CacheBackend):
+    """in process cache of parsed forecasts
+
+    once the cache holds max_size entries the least recently used one is evicted.
+    """
+
+    def __init__(self,
+                 max_size: int = 1024,
+                 ttls: typing.Optional[typing.Dict[ForecastType, float]] = None,
+                 clock: typing.Callable[[], float] = time.monotonic) -> None:
+        if max_size < 1:
+            raise ValueError('max_size must be a positive number')
+        super().__init__(ttls, clock)
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_entry(self, key: str) -> typing.Optional[CacheEntry]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def get(self, key: str) -> typing.Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= self._clock():
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry.value
+
+    def set(self, key: str, value: typing.Any, ttl: float) -> None:
+        now = self._clock()
+        with self._lock:
+            self._entries[key] = CacheEntry(value, now, now + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def purge_expired(self) -> int:
+        now = self._clock()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+
+class SQLiteCache(CacheBackend):
+    """cache of parsed forecasts in a sqlite database shared by all the processes of a host
+
+    the database runs in WAL mode so readers don't wait for the writers, the values
+    are pickled and the ttls are measured with the wall clock to be comparable
+    between processes. expired entries stay in the file until purge_expired or
+    compact are called.
+    """
+
+    def __init__(self,
+                 path: str,
+                 ttls: typing.Optional[typing.Dict[ForecastType, float]] = None,
+                 timeout: float = 5,
+                 clock: typing.Callable[[], float] = time.time) -> None:
+        super().__init__(ttls, clock)
+        self.path = path
+        self._timeout = timeout
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS forecasts ('
+                               'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                               'stored_at REAL NOT NULL, expires_at REAL NOT NULL)')
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite connections can't be shared between threads or forked processes,
+        # so every thread of every process opens its own
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self._timeout)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+
+    def __len__(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM forecasts').fetchone()[0]
+
+    def get_entry(self, key: str) -> typing.Optional[CacheEntry]:
+        row = self._connection().execute(
+            'SELECT value, stored_at, expires_at FROM forecasts WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(pickle.loads(row[0]), row[1], row[2])
+
+    def get(self, key: str) -> typing.Any:
+        row = self._connection().execute(
+            'SELECT value FROM forecasts WHERE key = ? AND expires_at > ?', (key, self._clock())
+        ).fetchone()
+        self._count(row is not None)
+        if row is None:
+            return None
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: typing.Any, ttl: float) -> None:
+        now = self._clock()
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connection() as connection:
+            connection.execute('INSERT OR REPLACE INTO forecasts VALUES (?, ?, ?, ?)',
+                               (key, data, now, now + ttl))
+
+    def delete(self, key: str) -> None:
+        with self._connection() as connection:
+            connection.execute('DELETE FROM forecasts WHERE key = ?', (key,))
+
+    def clear(self) -> None:
+        with self._connection() as connection:
+            connection.execute('DELETE FROM forecasts')
+
+    def purge_expired(self) -> int:
+        with self._connection() as connection:
+            cursor = connection.execute('DELETE FROM forecasts WHERE expires_at <= ?',
+                                        (self._clock(),))
+        return cursor.rowcount
+
+    def compact(self) -> int:
+        """purge the expired entries and give their space back to the file system"""
+        purged = self.purge_expired()
+        connection = self._connection()
+        connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        connection.execute('VACUUM')
+        return purged
+
+    def close(self) -> None:
+        """close the connection of the calling thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
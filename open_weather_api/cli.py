@@ -0,0 +1,236 @@
+import argparse
+from concurrent.futures import as_completed, ThreadPoolExecutor
+import csv
+from datetime import datetime
+import json
+import os
+import statistics
+import sys
+import time
+import typing
+
+from open_weather_api import config
+from open_weather_api.cache import SQLiteCache, TTLCache
+from open_weather_api.exceptions import NotFound
+from open_weather_api.fetch_weather import (
+    _chunk_city_ids,
+    BulkResult,
+    ForecastType,
+    OpenWeatherClient,
+    Units,
+)
+from open_weather_api.records import CurrentForecast, DailyForecast
+
+FORECAST_TYPES = {
+    'current': ForecastType.CURRENT,
+    'daily': ForecastType.DAILY_16,
+}
+
+CSV_FIELDS = {
+    ForecastType.CURRENT: ('city_id',) + CurrentForecast._keys,
+    # a row per day
+    ForecastType.DAILY_16: ('city_id', 'city_name', 'country') + DailyForecast._keys,
+}
+
+
+def read_city_ids(lines: typing.Iterable[str]) -> typing.List[int]:
+    """the city ids in lines, separated by white space or commas, in order and without
+    duplicates. the lines starting with # are comments."""
+    city_ids = {}
+    for line in lines:
+        if line.lstrip().startswith('#'):
+            continue
+        for token in line.replace(',', ' ').split():
+            try:
+                city_ids[int(token)] = None
+            except ValueError:
+                raise ValueError(f'not a city id: {token!r}') from None
+    return list(city_ids)
+
+
+def _json_default(value: typing.Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _csv_value(value: typing.Any) -> typing.Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class NdjsonWriter:
+    """writes every forecast as a json object on its own line"""
+
+    def __init__(self, stream: typing.TextIO, forecast_type: ForecastType) -> None:
+        self._stream = stream
+
+    def write(self, city_id: int, forecast: typing.Mapping) -> None:
+        line = json.dumps(dict(city_id=city_id, **forecast.to_dict()), default=_json_default,
+                          ensure_ascii=False)
+        self._stream.write(line + '\n')
+
+
+class CsvWriter:
+    """writes the forecasts as csv rows, the daily forecasts as a row per day"""
+
+    def __init__(self, stream: typing.TextIO, forecast_type: ForecastType) -> None:
+        self._forecast_type = forecast_type
+        self._writer = csv.DictWriter(stream, CSV_FIELDS[forecast_type], restval='')
+        self._writer.writeheader()
+
+    def write(self, city_id: int, forecast: typing.Mapping) -> None:
+        if self._forecast_type == ForecastType.CURRENT:
+            rows = [forecast.to_dict()]
+        else:
+            rows = [dict(day, city_name=forecast.city_name, country=forecast.country)
+                    for day in forecast.to_dict()['forecasts']]
+        for row in rows:
+            row['city_id'] = city_id
+            self._writer.writerow({key: _csv_value(value) for key, value in row.items()})
+
+
+WRITERS = {
+    'ndjson': NdjsonWriter,
+    'csv': CsvWriter,
+}
+
+
+def fetch_batch(client: OpenWeatherClient, chunk: typing.List[int],
+                forecast_type: ForecastType, units: Units) -> typing.Tuple[BulkResult, float]:
+    """fetch a batch of cities, the current weather of a chunk with one group call and
+    the daily forecast of one city, and the seconds it took"""
+    start = time.perf_counter()
+    if forecast_type == ForecastType.CURRENT:
+        result = client.get_forecasts_by_id(chunk, units, chunk_size=len(chunk), max_workers=1)
+        # the group api leaves the cities it doesn't know out of the answer
+        failed = {c_id for failed_chunk in result.failures for c_id in failed_chunk}
+        unknown = tuple(c_id for c_id in chunk
+                        if c_id not in result.forecasts and c_id not in failed)
+        if unknown:
+            result.failures[unknown] = NotFound('city not found', 404)
+    else:
+        try:
+            result = BulkResult(forecasts={chunk[0]: client.get_city_forecast(
+                chunk[0], forecast_type, units)}, failures={})
+        except Exception as e:
+            result = BulkResult(forecasts={}, failures={tuple(chunk): e})
+    return result, time.perf_counter() - start
+
+
+class Stats:
+    """the timing summary of --stats"""
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.batch_seconds = []
+        self.fetched = 0
+        self.failed = 0
+
+    def add(self, result: BulkResult, seconds: float) -> None:
+        self.batch_seconds.append(seconds)
+        self.fetched += len(result.forecasts)
+        self.failed += sum(len(chunk) for chunk in result.failures)
+
+    def summary(self, client: OpenWeatherClient) -> str:
+        elapsed = time.perf_counter() - self.start
+        lines = [
+            f'cities: {self.fetched} fetched, {self.failed} failed in '
+            f'{len(self.batch_seconds)} batches',
+            f'time: {elapsed:.3f}s total, {self.fetched / elapsed if elapsed else 0:.1f} '
+            'cities/s',
+        ]
+        if self.batch_seconds:
+            lines.append(f'batches: p50 {statistics.median(self.batch_seconds):.3f}s, '
+                         f'max {max(self.batch_seconds):.3f}s')
+        if client.cache is not None:
+            stats = client.cache.stats
+            lines.append(f'cache: {stats.hits} hits, {stats.misses} misses')
+        return '\n'.join(lines)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='open-weather',
+        description='fetch the weather of the cities of the given ids, one result per '
+                    'city as soon as its batch is fetched')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='file of city ids, separated by white space or commas '
+                             '(default: stdin)')
+    parser.add_argument('-t', '--type', choices=FORECAST_TYPES, default='current',
+                        help='current weather (fetched by groups of cities) or 16 days '
+                             'forecast (default: current)')
+    parser.add_argument('-u', '--units', choices=[units.name.lower() for units in Units],
+                        default='metric', help='(default: metric)')
+    parser.add_argument('-f', '--format', choices=WRITERS, default='ndjson',
+                        help='(default: ndjson)')
+    parser.add_argument('-c', '--concurrency', type=int, default=4,
+                        help='number of batches fetched at once (default: 4)')
+    parser.add_argument('--chunk-size', type=int, default=config.GROUP_MAX_IDS,
+                        help='cities per group call of the current weather '
+                             f'(default: {config.GROUP_MAX_IDS})')
+    parser.add_argument('--cache', metavar='PATH',
+                        help='sqlite file caching the forecasts between runs (default: '
+                             'in memory)')
+    parser.add_argument('--api-key', help='(default: $OPEN_WEATHER_API_KEY)')
+    parser.add_argument('--base-url', help=f'(default: {config.BASE_URL})')
+    parser.add_argument('--stats', action='store_true',
+                        help='print a timing summary to stderr at the end')
+    return parser
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    """run the command, the exit status is 1 when some cities failed"""
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.concurrency < 1 or not 1 <= args.chunk_size <= config.GROUP_MAX_IDS:
+        parser.error(f'--concurrency must be positive and --chunk-size between 1 and '
+                     f'{config.GROUP_MAX_IDS}')
+
+    try:
+        if args.input == '-':
+            city_ids = read_city_ids(sys.stdin)
+        else:
+            with open(args.input) as f:
+                city_ids = read_city_ids(f)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    forecast_type = FORECAST_TYPES[args.type]
+    units = Units[args.units.upper()]
+    # the daily forecasts are fetched city by city
+    chunk_size = args.chunk_size if forecast_type == ForecastType.CURRENT else 1
+    cache = SQLiteCache(args.cache) if args.cache else TTLCache()
+    writer = WRITERS[args.format](sys.stdout, forecast_type)
+    stats = Stats()
+    failed = False
+
+    with OpenWeatherClient(api_key=args.api_key, base_url=args.base_url,
+                           pool_size=args.concurrency, cache=cache) as client, \
+            ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        batches = [executor.submit(fetch_batch, client, chunk, forecast_type, units)
+                   for chunk in _chunk_city_ids(city_ids, chunk_size)]
+        try:
+            for batch in as_completed(batches):
+                result, seconds = batch.result()
+                stats.add(result, seconds)
+                for city_id, forecast in result.forecasts.items():
+                    writer.write(city_id, forecast)
+                sys.stdout.flush()
+                for chunk, error in result.failures.items():
+                    failed = True
+                    print(f'open-weather: cities {",".join(map(str, chunk))} failed: '
+                          f'{type(error).__name__}: {error}', file=sys.stderr)
+        except BrokenPipeError:
+            # the reader went away (like head), stop without a traceback
+            for batch in batches:
+                batch.cancel()
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 1
+
+    if args.stats:
+        print(stats.summary(client), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+from concurrent.futures import ThreadPoolExecutor
+import typing
+
+from open_weather_api.fetch_weather import (
+    _build_payload,
+    _chunk_city_ids,
+    ForecastType,
+    get_default_client,
+    OpenWeatherClient,
+    Units,
+)
+from open_weather_api.rate_limit import Priority
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the installed extras
+    np = None
+
+
+# column name: (path of the value in the json of a day, default when missing, dtype)
+DAILY_COLUMNS = {
+    'dt': (('dt',), None, 'int64'),
+    'sunrise': (('sunrise',), None, 'int64'),
+    'sunset': (('sunset',), None, 'int64'),
+    'day_temp': (('temp', 'day'), None, 'float64'),
+    'max_temp': (('temp', 'max'), None, 'float64'),
+    'min_temp': (('temp', 'min'), None, 'float64'),
+    'night_temp': (('temp', 'night'), None, 'float64'),
+    'eve_temp': (('temp', 'eve'), None, 'float64'),
+    'morning_temp': (('temp', 'morn'), None, 'float64'),
+    'day_feels_like': (('feels_like', 'day'), None, 'float64'),
+    'night_feels_like': (('feels_like', 'night'), None, 'float64'),
+    'eve_feels_like': (('feels_like', 'eve'), None, 'float64'),
+    'morning_feels_like': (('feels_like', 'morn'), None, 'float64'),
+    'pressure': (('pressure',), None, 'float64'),
+    'humidity': (('humidity',), None, 'float64'),
+    'wind_speed': (('speed',), None, 'float64'),
+    'wind_direction': (('deg',), None, 'float64'),
+    'precipitation_probability': (('pop',), None, 'float64'),
+    'rain': (('rain',), 0, 'float64'),
+    'snow': (('snow',), 0, 'float64'),
+}
+
+# same for the json of a city in the group api
+GROUP_COLUMNS = {
+    'dt': (('dt',), None, 'int64'),
+    'sunrise': (('sys', 'sunrise'), None, 'int64'),
+    'sunset': (('sys', 'sunset'), None, 'int64'),
+    'current_temp': (('main', 'temp'), None, 'float64'),
+    'min_temp': (('main', 'temp_min'), None, 'float64'),
+    'max_temp': (('main', 'temp_max'), None, 'float64'),
+    'feels_like': (('main', 'feels_like'), None, 'float64'),
+    'humidity': (('main', 'humidity'), None, 'float64'),
+    'pressure': (('main', 'pressure'), None, 'float64'),
+    'wind_speed': (('wind', 'speed'), None, 'float64'),
+    'wind_direction': (('wind', 'deg'), None, 'float64'),
+    'clouds': (('clouds', 'all'), None, 'float64'),
+}
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError('the columnar results need numpy, install it with '
+                          'pip install open-weather-client[columnar]')
+
+
+def _build_columns(rows: typing.List[typing.Dict],
+                   spec: typing.Dict[str, typing.Tuple]) -> typing.Dict[str, 'np.ndarray']:
+    columns = {}
+    for name, (path, default, dtype) in spec.items():
+        if len(path) == 1:
+            key = path[0]
+            values = (row[key] if default is None else row.get(key, default) for row in rows)
+        else:
+            outer, inner = path
+            values = (row[outer][inner] for row in rows)
+        columns[name] = np.fromiter(values, dtype=dtype, count=len(rows))
+    return columns
+
+
+class _Columns:
+    __slots__ = ('columns',)
+
+    def __getitem__(self, name: str) -> 'np.ndarray':
+        return self.columns[name]
+
+    def __len__(self) -> int:
+        return len(self.columns['dt'])
+
+    def datetimes(self, name: str = 'dt') -> 'np.ndarray':
+        """timestamp column name (dt, sunrise or sunset) as utc numpy datetime64[s]
+
+        converts the whole column in one vectorized pass, without a datetime object
+        per value
+        """
+        return self.columns[name].astype('datetime64[s]')
+
+
+class DailyColumns(_Columns):
+    """the 16 days forecasts of many cities as one numpy array per field
+
+    the rows of city i are offsets[i]:offsets[i + 1] of every column, the timestamps
+    (dt, sunrise, sunset) are int64 seconds since the epoch.
+    """
+    __slots__ = ('city_ids', 'city_names', 'countries', 'offsets')
+
+    def __init__(self, payloads: typing.Iterable[typing.Dict]) -> None:
+        _require_numpy()
+        payloads = list(payloads)
+        self.city_ids = np.fromiter((payload['city']['id'] for payload in payloads),
+                                    dtype='int64', count=len(payloads))
+        self.city_names = [payload['city']['name'] for payload in payloads]
+        self.countries = [payload['city']['country'] for payload in payloads]
+        counts = [len(payload['list']) for payload in payloads]
+        self.offsets = np.zeros(len(payloads) + 1, dtype='int64')
+        np.cumsum(counts, out=self.offsets[1:])
+
+        days = [day for payload in payloads for day in payload['list']]
+        self.columns = _build_columns(days, DAILY_COLUMNS)
+
+    @property
+    def city_index(self) -> 'np.ndarray':
+        """the index of the city of every row"""
+        return np.repeat(np.arange(len(self.city_ids)), np.diff(self.offsets))
+
+    def per_city(self, name: str, ufunc: typing.Any = None) -> 'np.ndarray':
+        """reduce column name to one value per city with ufunc (np.add by default)
+
+        every city must have at least one day
+        """
+        ufunc = ufunc if ufunc is not None else np.add
+        return ufunc.reduceat(self.columns[name], self.offsets[:-1])
+
+    def mean_per_city(self, name: str) -> 'np.ndarray':
+        return self.per_city(name) / np.diff(self.offsets)
+
+    def matrix(self, name: str) -> 'np.ndarray':
+        """column name as a cities x days matrix, all the cities must have as many days"""
+        return self.columns[name].reshape(len(self.city_ids), -1)
+
+
+class GroupColumns(_Columns):
+    """the current weather of many cities as one numpy array per field, a row per city"""
+    __slots__ = ('city_ids', 'city_names', 'countries')
+
+    def __init__(self, payloads: typing.Iterable[typing.Dict]) -> None:
+        _require_numpy()
+        cities = [city for payload in payloads for city in payload['list']]
+        self.city_ids = np.fromiter((city['id'] for city in cities), dtype='int64',
+                                    count=len(cities))
+        self.city_names = [city['name'] for city in cities]
+        self.countries = [city['sys']['country'] for city in cities]
+        self.columns = _build_columns(cities, GROUP_COLUMNS)
+
+
+def _fetch_raw(client: OpenWeatherClient,
+               requests: typing.List[typing.Tuple[ForecastType, typing.Dict]],
+               max_workers: typing.Optional[int]) -> typing.List[typing.Dict]:
+    if not requests:
+        return []
+    workers = min(max_workers or client._pool_size, len(requests))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            lambda request: client._fetch(request[0], request[1], Priority.NORMAL), requests))
+
+
+def fetch_daily_columns(city_ids: typing.Iterable[int],
+                        units: Units = Units.METRIC,
+                        client: typing.Optional[OpenWeatherClient] = None,
+                        max_workers: typing.Optional[int] = None) -> DailyColumns:
+    """fetch the 16 days forecasts of city_ids concurrently into a DailyColumns
+
+    the answers go straight from their json to the columns, without the cache
+    """
+    _require_numpy()
+    client = client or get_default_client()
+    requests = [(ForecastType.DAILY_16,
+                 _build_payload(c_id, ForecastType.DAILY_16, units, client.api_key))
+                for c_id in dict.fromkeys(city_ids)]
+    return DailyColumns(_fetch_raw(client, requests, max_workers))
+
+
+def fetch_group_columns(city_ids: typing.Iterable[int],
+                        units: Units = Units.METRIC,
+                        client: typing.Optional[OpenWeatherClient] = None,
+                        max_workers: typing.Optional[int] = None) -> GroupColumns:
+    """fetch the current weather of city_ids with chunked group calls into a GroupColumns
+
+    the answers go straight from their json to the columns, without the cache
+    """
+    _require_numpy()
+    client = client or get_default_client()
+    requests = [(ForecastType.MULTIPLE,
+                 _build_payload(chunk, ForecastType.MULTIPLE, units, client.api_key))
+                for chunk in _chunk_city_ids(city_ids, None)]
+    return GroupColumns(_fetch_raw(client, requests, max_workers))
@@ -1,5 +1,15 @@
 import os
+import typing
 
 
-API_KEY = os.environ.get('OPEN_WEATHER_API_KEY')
 BASE_URL = 'https://api.openweathermap.org/data/2.5/'
+# the group endpoint refuses requests for more than this number of city ids
+GROUP_MAX_IDS = 20
+
+
+def __getattr__(name: str) -> typing.Any:
+    # API_KEY is read from the environment when used and not when imported, so it can
+    # be set after the import, a value assigned to config.API_KEY takes precedence
+    if name == 'API_KEY':
+        return os.environ.get('OPEN_WEATHER_API_KEY')
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
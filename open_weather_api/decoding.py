@@ -0,0 +1,29 @@
+import typing
+
+# the backend is imported by the first decoding, orjson takes milliseconds to import
+_loads = None
+
+
+def _select_backend() -> typing.Callable[[typing.Union[bytes, str]], typing.Any]:
+    global BACKEND, _loads
+    try:
+        import orjson
+    except ImportError:  # pragma: no cover - depends on the installed extras
+        import json
+        BACKEND, _loads = 'json', json.loads
+    else:
+        BACKEND, _loads = 'orjson', orjson.loads
+    return _loads
+
+
+def loads(content: typing.Union[bytes, str]) -> typing.Any:
+    """decode the raw body of an answer with orjson when installed, else with json"""
+    return (_loads or _select_backend())(content)
+
+
+def __getattr__(name: str) -> typing.Any:
+    # BACKEND, 'orjson' or 'json', is set when the backend is imported
+    if name == 'BACKEND':
+        _select_backend()
+        return BACKEND
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,64 @@
+import typing
+
+
+class OpenWeatherError(Exception):
+    """base class of the errors raised by the open weather client"""
+
+
+class RateLimitExceeded(OpenWeatherError):
+    """the client side rate limiter shed the call instead of waiting for a token"""
+
+
+class QuotaExceeded(RateLimitExceeded):
+    """the monthly quota of calls was used up"""
+
+
+class CircuitOpenError(OpenWeatherError):
+    """the circuit breaker refused the call since the api keeps failing"""
+
+
+class ApiError(OpenWeatherError):
+    """the open weather api answered with an error
+
+    status_code is the http status of the answer, or its cod field when the api
+    reported the error in the body of a 200 answer.
+    """
+
+    def __init__(self, message: str, status_code: int) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+    def __reduce__(self) -> typing.Tuple:
+        return type(self), (str(self), self.status_code)
+
+
+class Unauthorized(ApiError):
+    """the api key is missing, wrong or not allowed to use the api (401)"""
+
+
+class NotFound(ApiError):
+    """the asked city is not known to the api (404)"""
+
+
+class RateLimited(ApiError):
+    """the api refused the call since the calls of the key went over its limits (429)"""
+
+
+class UpstreamError(ApiError):
+    """any other error answer of the api, like the 5xx of a degraded service"""
+
+
+_API_ERRORS = {
+    401: Unauthorized,
+    404: NotFound,
+    429: RateLimited,
+}
+
+
+def api_error(status_code: int, message: str) -> ApiError:
+    """the exception of an error answer with status_code"""
+    return _API_ERRORS.get(status_code, UpstreamError)(message, status_code)
+
+
+class UnknownCity(OpenWeatherError, LookupError):
+    """no city of the local city index matches the lookup"""
@@ -1,10 +1,27 @@
 from enum import Enum
+import itertools
+import threading
 import typing
-from datetime import datetime, timezone
 
-import requests
+from open_weather_api import config, decoding
+from open_weather_api.exceptions import api_error, CircuitOpenError, NotFound, UnknownCity
+from open_weather_api.instrumentation import CACHE_HIT, CACHE_MISS, CACHE_STALE, CallMetrics
+from open_weather_api.rate_limit import Priority
+from open_weather_api.records import CityForecasts, CurrentForecast
+from open_weather_api.singleflight import SingleFlight
 
-from open_weather_api import config
+# requests (with urllib3), concurrent.futures, logging, resilience and geo are imported
+# on first use, importing the package for a single call shouldn't pay for them up front
+if typing.TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+    import requests
+
+    from open_weather_api.cache import CacheBackend, CacheEntry
+    from open_weather_api.geo import City, CityIndex
+    from open_weather_api.instrumentation import Instrumentation
+    from open_weather_api.rate_limit import RateLimiter
+    from open_weather_api.resilience import CircuitBreaker
 
 
 class ForecastType(Enum):
@@ -19,140 +36,92 @@ class Units(Enum):
     IMPERIAL = 3
 
 
-def _update_day_times(forecast_data: typing.Dict, forecast: typing.Dict) -> None:
-    sunrise = datetime.fromtimestamp(forecast_data['sys']['sunrise'], tz=timezone.utc)
-    sunset = datetime.fromtimestamp(forecast_data['sys']['sunset'], tz=timezone.utc)
-    forecast_time = datetime.fromtimestamp(forecast_data['dt'], tz=timezone.utc)
+def _unchanged(value: float) -> float:
+    return value
 
-    forecast.update({
-        'forecast_time': forecast_time,
-        'sunrise_time': sunrise,
-        'sunset_time': sunset
-    })
 
+def _linear(scale: float, offset: float) -> typing.Callable[[float], float]:
+    def convert(value: float) -> float:
+        # rounded like the answers of the api in these units
+        return round(value * scale + offset, 2)
 
-def _get_main_data(forecast_data: typing.Dict) -> typing.Dict:
-    return {
-        'main': forecast_data['weather'][0]['main'],
-        'description': forecast_data['weather'][0]['description'],
-        'current_temp': forecast_data['main']['temp'],
-        'min_temp': forecast_data['main']['temp_min'],
-        'max_temp': forecast_data['main']['temp_max'],
-        'feels_like': forecast_data['main']['feels_like'],
-        'humidity': forecast_data['main']['humidity'],
-        'pressure': forecast_data['main']['pressure'],
-        'wind_speed': forecast_data['wind']['speed'],
-        'wind_direction': forecast_data['wind']['deg'],
-        'clouds': forecast_data['clouds']['all'],
-        'city_name': forecast_data['name'],
-        'country': forecast_data['sys']['country'],
-    }
+    return convert
 
 
-def _parse_forecast_current(forecast_data: typing.Dict) -> typing.Dict:
-    forecast = _get_main_data(forecast_data)
-
-    _update_day_times(forecast_data, forecast)
-
-    if 'rain' in forecast_data:
-        forecast['rain'] = forecast_data['rain']['1h']
-    else:
-        forecast['rain'] = 0
-
-    if 'snow' in forecast_data:
-        forecast['snow'] = forecast_data['snow']['1h']
-    else:
-        forecast['snow'] = 0
-
-    return forecast
-
-
-def _parse_forecast_daily(forecast_data: typing.Dict) -> typing.Dict:
-    forecasts = []
-    for forecast_day in forecast_data['list']:
-        forecast_time = datetime.fromtimestamp(forecast_day['dt'], tz=timezone.utc)
-        sunrise = datetime.fromtimestamp(forecast_day['sunrise'], tz=timezone.utc)
-        sunset = datetime.fromtimestamp(forecast_day['sunset'], tz=timezone.utc)
-        data = {
-            'forecast_time': forecast_time,
-            'sunrise_time': sunrise,
-            'sunset_time': sunset,
-            'day_temp': forecast_day['temp']['day'],
-            'max_temp': forecast_day['temp']['max'],
-            'min_temp': forecast_day['temp']['min'],
-            'night_temp': forecast_day['temp']['night'],
-            'eve_temp': forecast_day['temp']['eve'],
-            'morning_temp': forecast_day['temp']['morn'],
-            'day_feels_like': forecast_day['feels_like']['day'],
-            'night_feels_like': forecast_day['feels_like']['night'],
-            'eve_feels_like': forecast_day['feels_like']['eve'],
-            'morning_feels_like': forecast_day['feels_like']['morn'],
-            'pressure': forecast_day['pressure'],
-            'humidity': forecast_day['humidity'],
-            'main': forecast_day['weather'][0]['main'],
-            'description': forecast_day['weather'][0]['description'],
-            'wind_speed': forecast_day['speed'],
-            'wind_direction': forecast_day['deg'],
-            'precipitation_probability': forecast_day['pop']
-        }
-
-        if 'rain' in forecast_day:
-            data['rain'] = forecast_day['rain']
-        else:
-            data['rain'] = 0
+# the clients fetch and cache the forecasts in Units.STANDARD only and convert them
+# locally, these are the conversions of its temperatures (kelvin) and wind speeds
+# (meter/sec) to the other units
+_UNIT_CONVERSIONS = {
+    Units.METRIC: (_linear(1, -273.15), _unchanged),
+    Units.IMPERIAL: (_linear(1.8, -459.67), _linear(2.236936, 0)),
+}
 
-        if 'snow' in forecast_day:
-            data['snow'] = forecast_day['snow']
-        else:
-            data['snow'] = 0
 
-        forecasts.append(data)
+def _in_units(forecast: typing.Any, forecast_type: ForecastType, units: Units) -> typing.Any:
+    """convert a forecast of Units.STANDARD to units, of ForecastType.MULTIPLE a dict of
+    the forecasts of the cities"""
+    conversion = _UNIT_CONVERSIONS.get(units)
+    if conversion is None or forecast is None:
+        return forecast
+    if forecast_type == ForecastType.MULTIPLE:
+        return {key: city._in_units(*conversion) for key, city in forecast.items()}
+    return forecast._in_units(*conversion)
 
-    weather = {
-        'city_name': forecast_data['city']['name'],
-        'country': forecast_data['city']['country'],
-        'forecasts': forecasts
-    }
 
-    return weather
+def _from_group(forecast: typing.Any) -> bool:
+    """whether a cached current weather came from a group answer, which doesn't
+    report rain and snow, so it can't answer a ForecastType.CURRENT call"""
+    return isinstance(forecast, CurrentForecast) and forecast.rain is None
 
 
-def _parse_forecast_group(forecast_data: typing.Dict) -> typing.Dict:
+def _parse_forecast_current(forecast_data: typing.Dict) -> CurrentForecast:
+    return CurrentForecast.from_json(forecast_data)
+
+
+def _parse_forecast_daily(forecast_data: typing.Dict) -> CityForecasts:
+    return CityForecasts.from_json(forecast_data)
+
+
+def _parse_forecast_group(forecast_data: typing.Dict) -> typing.Dict[str, CurrentForecast]:
     forecasts = {}
     for forecast_city in forecast_data['list']:
-        forecast_time = datetime.fromtimestamp(forecast_city['dt'], timezone.utc)
-        sunrise = datetime.fromtimestamp(forecast_city['sys']['sunrise'], timezone.utc)
-        sunset = datetime.fromtimestamp(forecast_city['sys']['sunset'], timezone.utc)
-
-        data = _get_main_data(forecast_city)
-        data.update({
-            'forecast_time': forecast_time,
-            'sunrise_time': sunrise,
-            'sunset_time': sunset
-        })
-        forecasts[forecast_city['name']] = data
+        forecasts[forecast_city['name']] = CurrentForecast.from_json(forecast_city,
+                                                                     precipitation=False)
     return forecasts
 
 
-def get_city_forecast(city_id: typing.Union[int, typing.List],
-                      forecast_type: ForecastType = ForecastType.CURRENT,
-                      units: Units = Units.METRIC) -> typing.Dict:
-    """get the weather of city_id city for forecast_type type"""
-    api_parser = {
-        ForecastType.CURRENT: {
-            'api': 'weather',
-            'parser': _parse_forecast_current,
-        },
-        ForecastType.DAILY_16: {
-            'api': 'forecast/daily',
-            'parser': _parse_forecast_daily,
-        },
-        ForecastType.MULTIPLE: {
-            'api': 'group',
-            'parser': _parse_forecast_group,
-        }
+def _parse_group_cities(forecast_data: typing.Dict
+                        ) -> typing.List[typing.Tuple[typing.Dict, CurrentForecast]]:
+    return [(forecast_city, CurrentForecast.from_json(forecast_city, precipitation=False))
+            for forecast_city in forecast_data['list']]
+
+
+def _parse_group_by_id(forecast_data: typing.Dict) -> typing.Dict[int, CurrentForecast]:
+    # unlike _parse_forecast_group the cities of the same name don't hide each other
+    return {forecast_city['id']: forecast
+            for forecast_city, forecast in _parse_group_cities(forecast_data)}
+
+
+_API_PARSER = {
+    ForecastType.CURRENT: {
+        'api': 'weather',
+        'parser': _parse_forecast_current,
+    },
+    ForecastType.DAILY_16: {
+        'api': 'forecast/daily',
+        'parser': _parse_forecast_daily,
+    },
+    ForecastType.MULTIPLE: {
+        'api': 'group',
+        'parser': _parse_forecast_group,
     }
+}
+
 
+def _build_payload(city_id: typing.Union[int, typing.List],
+                   forecast_type: ForecastType,
+                   units: Units,
+                   api_key: typing.Optional[str]) -> typing.Dict:
     if isinstance(city_id, list) and forecast_type == ForecastType.MULTIPLE:
         city_id = ','.join(str(c_id) for c_id in city_id)
     elif forecast_type == ForecastType.MULTIPLE:
@@ -161,14 +130,781 @@ def get_city_forecast(city_id: typing.Union[int, typing.List],
         raise ValueError('if you choose a different option than Forecast.MULTIPLE you must give '
                          'city_id as int')
 
-    payload = {
+    return {
         'id': city_id,
-        'appid': config.API_KEY,
+        'appid': api_key,
         'units': units.name.lower()
     }
 
-    url = f"{config.BASE_URL}{api_parser[forecast_type]['api']}"
-    res = requests.get(url, params=payload)
-    res = res.json()
 
-    return api_parser[forecast_type]['parser'](res)
+def _error_message(content: bytes) -> str:
+    try:
+        return str(decoding.loads(content)['message'])
+    except (ValueError, TypeError, KeyError):
+        # not the json of the api, like the html page of a proxy
+        return content[:200].decode('utf-8', 'replace')
+
+
+def _check_status(status_code: int, content: bytes) -> None:
+    if status_code >= 400:
+        raise api_error(status_code, _error_message(content))
+
+
+def _check_cod(data: typing.Any) -> None:
+    cod = data.get('cod') if isinstance(data, dict) else None
+    if cod is not None and int(cod) >= 400:
+        raise api_error(int(cod), str(data.get('message', '')))
+
+
+def _decode_answer(status_code: int, content: bytes) -> typing.Dict:
+    """decode the json of an answer, raising the exceptions.ApiError of an error answer
+
+    the errors are found by the http status or by the cod field of the body, before
+    the answer gets to the parsers.
+    """
+    _check_status(status_code, content)
+    data = decoding.loads(content)
+    _check_cod(data)
+    return data
+
+
+class _NotFoundEntry(typing.NamedTuple):
+    """cached in place of the forecast of a city the api doesn't know"""
+    message: str
+
+
+def _cache_key(forecast_type: ForecastType, city_id: typing.Union[int, str], units: Units) -> str:
+    return f'{forecast_type.name}:{city_id}:{units.name}'
+
+
+class BulkResult(typing.NamedTuple):
+    """merged result of a chunked ForecastType.MULTIPLE request
+
+    forecasts maps the city name to its forecast like _parse_forecast_group and
+    failures maps the tuple of city ids of every failed chunk to its exception.
+    """
+    forecasts: typing.Dict
+    failures: typing.Dict[typing.Tuple[int, ...], Exception]
+
+
+class RegionForecast(typing.NamedTuple):
+    city: 'City'
+    distance_km: float
+    forecast: typing.Mapping
+
+
+class RegionResult(typing.NamedTuple):
+    """result of a region query
+
+    forecasts holds the RegionForecast of every city of the region, the nearest to
+    the point of the query first, and failures is like the failures of BulkResult.
+    """
+    forecasts: typing.List[RegionForecast]
+    failures: typing.Dict[typing.Tuple[int, ...], Exception]
+
+
+def _chunk_city_ids(city_ids: typing.Iterable[int],
+                    chunk_size: typing.Optional[int]) -> typing.List[typing.List[int]]:
+    chunk_size = chunk_size or config.GROUP_MAX_IDS
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be a positive number')
+
+    # a city asked twice would only waste room in the chunks
+    ids = iter(dict.fromkeys(city_ids))
+    chunks = []
+    chunk = list(itertools.islice(ids, chunk_size))
+    while chunk:
+        chunks.append(chunk)
+        chunk = list(itertools.islice(ids, chunk_size))
+    return chunks
+
+
+def _merge_chunks(chunks: typing.List[typing.List[int]],
+                  results: typing.List[typing.Union[typing.Dict, Exception]]) -> BulkResult:
+    bulk = BulkResult(forecasts={}, failures={})
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, Exception):
+            bulk.failures[tuple(chunk)] = result
+        else:
+            bulk.forecasts.update(result)
+    return bulk
+
+
+def _thread_pool(max_workers: int) -> 'ThreadPoolExecutor':
+    from concurrent.futures import ThreadPoolExecutor
+
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+def _record_response(call: CallMetrics, res: 'requests.Response') -> None:
+    call.status_code = res.status_code
+    retries = getattr(res.raw, 'retries', None)
+    call.retries = len(retries.history) if retries is not None else 0
+
+
+class OpenWeatherClient:
+    """client for the open weather api that reuses its connections between calls
+
+    pool_size is the number of connections kept alive per host, connect_timeout and
+    read_timeout limit the seconds a call waits for the connection and for every read
+    of the answer (None waits forever). max_retries and backoff_factor configure the
+    retries done on connection errors, 429 and 5xx answers, with a jittered
+    exponential backoff or the wait asked by a Retry-After header.
+    api_key and base_url default to the values in config at call time.
+    cache is an optional cache.CacheBackend the parsed forecasts are kept in.
+    with coalesce identical calls made while one of them is in flight wait for it
+    and share its result instead of fetching again.
+    rate_limiter is an optional rate_limit.RateLimiter every upstream call waits for.
+    with max_staleness a cached forecast that expired less than max_staleness seconds
+    ago is returned right away and refreshed by refresh_workers background threads,
+    hard_expiry caps the age of any cached forecast the client returns.
+    instrumentation is an optional instrumentation.Instrumentation told about every
+    upstream call and cache lookup.
+    circuit_breaker is an optional resilience.CircuitBreaker, while it is open the
+    calls raise exceptions.CircuitOpenError right away, or with serve_cached_when_open
+    return the last cached forecast like get_cached_forecast when there is one.
+    the error answers of the api raise the exceptions.ApiError of their status, a
+    city the api doesn't know is kept in the cache for not_found_ttl seconds (None
+    doesn't keep it) and asking for it again raises exceptions.NotFound right away.
+    city_index is an optional geo.CityIndex the cities can be looked up in by
+    coordinates and by name.
+    """
+
+    def __init__(self,
+                 api_key: typing.Optional[str] = None,
+                 base_url: typing.Optional[str] = None,
+                 pool_size: int = 10,
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.3,
+                 connect_timeout: typing.Optional[float] = 3.05,
+                 read_timeout: typing.Optional[float] = 10,
+                 keep_alive: bool = True,
+                 cache: typing.Optional['CacheBackend'] = None,
+                 coalesce: bool = True,
+                 rate_limiter: typing.Optional['RateLimiter'] = None,
+                 max_staleness: typing.Optional[float] = None,
+                 hard_expiry: typing.Optional[float] = None,
+                 refresh_workers: int = 4,
+                 instrumentation: typing.Optional['Instrumentation'] = None,
+                 circuit_breaker: typing.Optional['CircuitBreaker'] = None,
+                 serve_cached_when_open: bool = False,
+                 not_found_ttl: typing.Optional[float] = 60,
+                 city_index: typing.Optional['CityIndex'] = None) -> None:
+        self.cache = cache
+        self.instrumentation = instrumentation
+        self.circuit_breaker = circuit_breaker
+        self.serve_cached_when_open = serve_cached_when_open
+        self.not_found_ttl = not_found_ttl
+        self.city_index = city_index
+        self.rate_limiter = rate_limiter
+        self.max_staleness = max_staleness
+        self.hard_expiry = hard_expiry
+        self._refresh_workers = refresh_workers
+        self._refresher = None
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._flights = SingleFlight() if coalesce else None
+        self._api_key = api_key
+        self._base_url = base_url
+        self._pool_size = pool_size
+        self._max_retries = max_retries
+        self._backoff_factor = backoff_factor
+        self._keep_alive = keep_alive
+        self._timeout = (connect_timeout, read_timeout)
+        self._http = None
+        self._http_lock = threading.Lock()
+
+    def _create_session(self) -> 'requests.Session':
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        from open_weather_api.resilience import JitteredRetry, RETRY_STATUSES
+
+        session = requests.Session()
+        retries = JitteredRetry(total=self._max_retries,
+                                backoff_factor=self._backoff_factor,
+                                status_forcelist=RETRY_STATUSES,
+                                # the last answer gets the exception of its status
+                                raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=self._pool_size,
+                              pool_maxsize=self._pool_size,
+                              max_retries=retries)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not self._keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    @property
+    def _session(self) -> 'requests.Session':
+        # created on the first call, with the import of requests
+        if self._http is None:
+            with self._http_lock:
+                if self._http is None:
+                    self._http = self._create_session()
+        return self._http
+
+    @property
+    def api_key(self) -> typing.Optional[str]:
+        return self._api_key if self._api_key is not None else config.API_KEY
+
+    @property
+    def base_url(self) -> str:
+        return self._base_url if self._base_url is not None else config.BASE_URL
+
+    def close(self) -> None:
+        """close all the pooled connections and wait for the background refreshes"""
+        if self._refresher is not None:
+            self._refresher.shutdown(wait=True)
+            self._refresher = None
+        if self._http is not None:
+            self._http.close()
+
+    def __enter__(self) -> 'OpenWeatherClient':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _send(self, forecast_type: ForecastType, payload: typing.Dict, priority: Priority,
+              call: typing.Optional[CallMetrics] = None,
+              stream: bool = False) -> 'requests.Response':
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.acquire()
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(priority)
+            if call is not None:
+                call.mark('rate_limit')
+
+        url = f"{self.base_url}{_API_PARSER[forecast_type]['api']}"
+        if self.circuit_breaker is None:
+            return self._session.get(url, params=payload, timeout=self._timeout, stream=stream)
+
+        # a client with a circuit breaker has imported resilience already
+        from requests import RequestException
+
+        from open_weather_api.resilience import RETRY_STATUSES
+
+        try:
+            res = self._session.get(url, params=payload, timeout=self._timeout, stream=stream)
+        except RequestException:
+            self.circuit_breaker.record_failure()
+            raise
+        if res.status_code in RETRY_STATUSES:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+        return res
+
+    def _fetch(self, forecast_type: ForecastType, payload: typing.Dict, priority: Priority,
+               parse: typing.Optional[typing.Callable] = None, raw: bool = False) -> typing.Any:
+        # with raw the body is returned as is, only checking the status of the answer
+        if self.instrumentation is not None:
+            return self._fetch_instrumented(forecast_type, payload, priority, parse, raw)
+        res = self._send(forecast_type, payload, priority)
+        if raw:
+            _check_status(res.status_code, res.content)
+            return res.content
+        data = _decode_answer(res.status_code, res.content)
+        return parse(data) if parse is not None else data
+
+    def _fetch_instrumented(self, forecast_type: ForecastType, payload: typing.Dict,
+                            priority: Priority, parse: typing.Optional[typing.Callable],
+                            raw: bool) -> typing.Any:
+        # the same as _fetch, measuring every phase of the call
+        call = CallMetrics(forecast_type, Units[payload['units'].upper()])
+        try:
+            res = self._send(forecast_type, payload, priority, call)
+            call.mark_response(res.elapsed.total_seconds())
+            _record_response(call, res)
+            call.response_size = len(res.content)
+            if raw:
+                _check_status(res.status_code, res.content)
+                return res.content
+
+            data = _decode_answer(res.status_code, res.content)
+            call.mark('decode')
+            if parse is not None:
+                data = parse(data)
+                call.mark('parse')
+            return data
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            self.instrumentation.on_call(call)
+
+    def _fetch_stream(self, forecast_type: ForecastType, payload: typing.Dict,
+                      priority: Priority, chunk_size: int) -> typing.Iterator[bytes]:
+        call = None
+        if self.instrumentation is not None:
+            call = CallMetrics(forecast_type, Units[payload['units'].upper()])
+        try:
+            with self._send(forecast_type, payload, priority, call, stream=True) as res:
+                if call is not None:
+                    call.mark('response')
+                    _record_response(call, res)
+                # only an error answer is read whole, reading res.content here would
+                # download all of the answer before the first chunk
+                if res.status_code >= 400:
+                    raise api_error(res.status_code, _error_message(res.content))
+                if call is None:
+                    yield from res.iter_content(chunk_size)
+                    return
+
+                call.response_size = 0
+                for chunk in res.iter_content(chunk_size):
+                    call.response_size += len(chunk)
+                    yield chunk
+                call.mark('download')
+        except Exception as e:
+            if call is not None:
+                call.error = e
+            raise
+        finally:
+            if call is not None:
+                self.instrumentation.on_call(call)
+
+    def get_city_forecast(self,
+                          city_id: typing.Union[int, typing.List],
+                          forecast_type: ForecastType = ForecastType.CURRENT,
+                          units: Units = Units.METRIC,
+                          use_cache: bool = True,
+                          priority: Priority = Priority.NORMAL) -> typing.Mapping:
+        """get the weather of city_id city for forecast_type type
+
+        when the client has a cache a fresh cached forecast is returned without
+        fetching or parsing it again, use_cache=False always fetches it (and
+        refreshes the cache).
+        the cache keeps the current weather per city, so ForecastType.MULTIPLE only
+        fetches the cities that aren't fresh in it.
+        with a rate limiter the call waits for a token by priority and raises
+        exceptions.RateLimitExceeded when it is shed, get_cached_forecast can then
+        give the last known forecast.
+        the forecasts are always fetched and cached in Units.STANDARD and converted
+        to units, so the cities asked in many units are fetched and cached once.
+        """
+        forecast = self._get_forecast(city_id, forecast_type, use_cache, priority)
+        return _in_units(forecast, forecast_type, units)
+
+    def _get_forecast(self, city_id: typing.Union[int, typing.List],
+                      forecast_type: ForecastType, use_cache: bool,
+                      priority: Priority) -> typing.Mapping:
+        units = Units.STANDARD
+        payload = _build_payload(city_id, forecast_type, units, self.api_key)
+
+        key = _cache_key(forecast_type, payload['id'], units)
+        try:
+            if self.cache is not None and forecast_type == ForecastType.MULTIPLE:
+                return self._get_group_forecast(city_id, units, priority, use_cache)
+            if use_cache and self.cache is not None:
+                forecast, outcome = self._lookup(key, forecast_type, units)
+                if outcome == CACHE_STALE:
+                    self._refresh_in_background(key, self._fetch_forecast, forecast_type,
+                                                payload, key, Priority.LOW)
+                if isinstance(forecast, _NotFoundEntry):
+                    raise NotFound(forecast.message, 404)
+                if forecast is not None:
+                    return forecast
+
+            return self._single_flight(key, self._fetch_forecast, forecast_type, payload, key,
+                                       priority)
+        except CircuitOpenError:
+            if not self.serve_cached_when_open:
+                raise
+            forecast = self.get_cached_forecast(city_id, forecast_type, units)
+            if not forecast:
+                raise
+            return forecast
+
+    def _require_city_index(self) -> 'CityIndex':
+        if self.city_index is None:
+            raise ValueError('looking up cities needs a client with a city_index')
+        return self.city_index
+
+    def get_forecast_by_coordinates(self,
+                                    lat: float,
+                                    lon: float,
+                                    forecast_type: ForecastType = ForecastType.CURRENT,
+                                    units: Units = Units.METRIC,
+                                    count: int = 1,
+                                    use_cache: bool = True,
+                                    priority: Priority = Priority.NORMAL) -> typing.Mapping:
+        """get the weather of the city of the city index nearest to lat, lon
+
+        ForecastType.MULTIPLE gets the current weather of the count nearest cities
+        """
+        if forecast_type != ForecastType.MULTIPLE:
+            count = 1
+        cities = self._require_city_index().nearest(lat, lon, count)
+        if not cities:
+            raise UnknownCity('the city index is empty')
+        if forecast_type == ForecastType.MULTIPLE:
+            city_id = [city.id for city in cities]
+        else:
+            city_id = cities[0].id
+        return self.get_city_forecast(city_id, forecast_type, units, use_cache, priority)
+
+    def get_forecast_by_name(self,
+                             name: str,
+                             country: typing.Optional[str] = None,
+                             forecast_type: ForecastType = ForecastType.CURRENT,
+                             units: Units = Units.METRIC,
+                             use_cache: bool = True,
+                             priority: Priority = Priority.NORMAL) -> typing.Mapping:
+        """get the weather of the city called name (of country) in the city index
+
+        the name is matched without case and accents, when many cities match the one
+        of the first country and then of the lowest id is used.
+        """
+        if forecast_type == ForecastType.MULTIPLE:
+            raise ValueError('only ForecastType.CURRENT and ForecastType.DAILY_16 can be '
+                             'looked up by name')
+        cities = self._require_city_index().find(name, country)
+        if not cities:
+            raise UnknownCity(f'no city called {name!r} in the city index')
+        return self.get_city_forecast(cities[0].id, forecast_type, units, use_cache, priority)
+
+    def _single_flight(self, key: str, func: typing.Callable, *args) -> typing.Any:
+        if self._flights is None:
+            return func(*args)
+        return self._flights.do(key, func, *args)
+
+    def _lookup(self, key: str, forecast_type: ForecastType,
+                units: Units) -> typing.Tuple[typing.Any, str]:
+        forecast = self.cache.get(key)
+        outcome = CACHE_HIT
+        if forecast is not None and self.hard_expiry is not None:
+            # with hard_expiry below the ttl a fresh entry can be too old as well
+            entry = self.cache.get_entry(key)
+            if entry is None or self._hard_expired(entry):
+                forecast = None
+        if forecast is None:
+            forecast = self._get_stale(key)
+            outcome = CACHE_STALE if forecast is not None else CACHE_MISS
+        if forecast_type == ForecastType.CURRENT and _from_group(forecast):
+            forecast, outcome = None, CACHE_MISS
+        if self.instrumentation is not None:
+            self.instrumentation.on_cache(forecast_type, units, outcome)
+        return forecast, outcome
+
+    def _get_stale(self, key: str) -> typing.Any:
+        if self.max_staleness is None:
+            return None
+        entry = self.cache.get_entry(key)
+        if entry is None:
+            return None
+        if self.cache.now() >= entry.expires_at + self.max_staleness:
+            return None
+        if self._hard_expired(entry):
+            return None
+        return entry.value
+
+    def _hard_expired(self, entry: 'CacheEntry') -> bool:
+        return self.hard_expiry is not None and \
+            self.cache.now() - entry.stored_at >= self.hard_expiry
+
+    def _refresh_in_background(self, key: str, func: typing.Callable, *args) -> None:
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresher is None:
+                self._refresher = _thread_pool(max_workers=self._refresh_workers)
+            self._refresher.submit(self._refresh, key, func, *args)
+
+    def _refresh(self, key: str, func: typing.Callable, *args) -> None:
+        try:
+            self._single_flight(key, func, *args)
+        except Exception:
+            import logging
+            logging.getLogger(__name__).warning('background refresh of %s failed', key,
+                                                exc_info=True)
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(key)
+
+    @property
+    def coalesced(self) -> int:
+        """number of calls that got the result of an identical call already in flight"""
+        return self._flights.coalesced if self._flights is not None else 0
+
+    def _fetch_forecast(self, forecast_type: ForecastType, payload: typing.Dict,
+                        key: str, priority: Priority) -> typing.Mapping:
+        try:
+            forecast = self._fetch(forecast_type, payload, priority,
+                                   _API_PARSER[forecast_type]['parser'])
+        except NotFound as e:
+            if self.cache is not None and self.not_found_ttl:
+                self.cache.set(key, _NotFoundEntry(str(e)), self.not_found_ttl)
+            raise
+        if self.cache is not None:
+            self.cache.set(key, forecast, self.cache.ttl_for(forecast_type))
+        return forecast
+
+    def _fetch_group(self, payload: typing.Dict, units: Units,
+                     priority: Priority) -> typing.Dict[int, CurrentForecast]:
+        city_ids = [int(c_id) for c_id in payload['id'].split(',')]
+        try:
+            cities = self._fetch(ForecastType.MULTIPLE, payload, priority, _parse_group_cities)
+        except NotFound as e:
+            self._cache_not_found(city_ids, units, str(e))
+            raise
+
+        city_forecasts = {}
+        ttl = self.cache.ttl_for(ForecastType.MULTIPLE)
+        for forecast_city, forecast in cities:
+            # index the city like a ForecastType.CURRENT answer so the group calls of
+            # any cities are served from the same entries, without rain and snow the
+            # entry only serves the group calls
+            self.cache.set(_cache_key(ForecastType.CURRENT, forecast_city['id'], units),
+                           forecast, ttl)
+            city_forecasts[forecast_city['id']] = forecast
+        # the group api leaves the cities it doesn't know out of the answer
+        self._cache_not_found([c_id for c_id in city_ids if c_id not in city_forecasts],
+                              units, 'city not found')
+        return city_forecasts
+
+    def _cache_not_found(self, city_ids: typing.List[int], units: Units,
+                         message: str) -> None:
+        if not self.not_found_ttl:
+            return
+        for c_id in city_ids:
+            self.cache.set(_cache_key(ForecastType.CURRENT, c_id, units),
+                           _NotFoundEntry(message), self.not_found_ttl)
+
+    def _get_cached_group(self, city_ids: typing.List[int], units: Units
+                          ) -> typing.Tuple[typing.Dict[int, CurrentForecast], typing.List[int]]:
+        """the cached current weather of city_ids by id and the ids missing in the cache
+
+        the cities that are only stale are refreshed in the background and the cities
+        the api doesn't know are in neither.
+        """
+        city_forecasts = {}
+        unknown = set()
+        stale = []
+        for c_id in city_ids:
+            key = _cache_key(ForecastType.CURRENT, c_id, units)
+            forecast, outcome = self._lookup(key, ForecastType.MULTIPLE, units)
+            if isinstance(forecast, _NotFoundEntry):
+                # a city the api doesn't know isn't asked for until the entry expires
+                unknown.add(c_id)
+                continue
+            if outcome == CACHE_STALE:
+                stale.append(c_id)
+            if forecast is not None:
+                city_forecasts[c_id] = forecast._replace(rain=None, snow=None)
+
+        if stale:
+            payload = _build_payload(stale, ForecastType.MULTIPLE, units, self.api_key)
+            key = _cache_key(ForecastType.MULTIPLE, payload['id'], units)
+            self._refresh_in_background(key, self._fetch_group, payload, units, Priority.LOW)
+
+        missing = [c_id for c_id in city_ids
+                   if c_id not in city_forecasts and c_id not in unknown]
+        return city_forecasts, missing
+
+    def _get_group(self, city_ids: typing.List[int], units: Units,
+                   priority: Priority) -> typing.Dict[int, CurrentForecast]:
+        """fetch the current weather of city_ids by id with one group call"""
+        payload = _build_payload(city_ids, ForecastType.MULTIPLE, units, self.api_key)
+        key = _cache_key(ForecastType.MULTIPLE, payload['id'], units)
+        if self.cache is not None:
+            return self._single_flight(key, self._fetch_group, payload, units, priority)
+        # the identical calls of get_city_forecast share the key without the suffix
+        # and their result is keyed by name
+        return self._single_flight(f'{key}:by_id', self._fetch, ForecastType.MULTIPLE, payload,
+                                   priority, _parse_group_by_id)
+
+    def _get_group_forecast(self, city_ids: typing.List, units: Units, priority: Priority,
+                            use_cache: bool) -> typing.Dict:
+        city_ids = [int(c_id) for c_id in city_ids]
+        city_forecasts, missing = {}, city_ids
+        if use_cache:
+            city_forecasts, missing = self._get_cached_group(city_ids, units)
+        if missing:
+            city_forecasts.update(self._get_group(missing, units, priority))
+
+        group = {}
+        for c_id in city_ids:
+            if c_id in city_forecasts:
+                group[city_forecasts[c_id]['city_name']] = city_forecasts[c_id]
+        return group
+
+    def get_cached_forecast(self,
+                            city_id: typing.Union[int, typing.List],
+                            forecast_type: ForecastType = ForecastType.CURRENT,
+                            units: Units = Units.METRIC) -> typing.Optional[typing.Mapping]:
+        """get the last cached forecast even if it expired, without fetching it
+
+        a degraded answer for when the call is shed by the rate limiter, None when
+        nothing is cached or the forecast is older than hard_expiry.
+        for ForecastType.MULTIPLE only the cached cities are in the result.
+        """
+        payload = _build_payload(city_id, forecast_type, Units.STANDARD, self.api_key)
+        if self.cache is None:
+            return None
+
+        if forecast_type != ForecastType.MULTIPLE:
+            entry = self.cache.get_entry(_cache_key(forecast_type, payload['id'],
+                                                    Units.STANDARD))
+            if entry is None or self._hard_expired(entry) or \
+                    isinstance(entry.value, _NotFoundEntry) or \
+                    (forecast_type == ForecastType.CURRENT and _from_group(entry.value)):
+                return None
+            return _in_units(entry.value, forecast_type, units)
+
+        group = {}
+        for c_id in city_id:
+            entry = self.cache.get_entry(_cache_key(ForecastType.CURRENT, c_id, Units.STANDARD))
+            if entry is not None and not self._hard_expired(entry) and \
+                    not isinstance(entry.value, _NotFoundEntry):
+                group[entry.value.city_name] = entry.value._replace(rain=None, snow=None)
+        return _in_units(group, forecast_type, units)
+
+    def _get_chunks(self, chunks: typing.List[typing.List[int]],
+                    get_chunk: typing.Callable[[typing.List[int]], typing.Dict],
+                    max_workers: typing.Optional[int]) -> BulkResult:
+        """get every chunk with get_chunk concurrently, a failed chunk is reported in
+        the failures of the result and doesn't stop the other chunks"""
+        def get(chunk: typing.List[int]) -> typing.Union[typing.Dict, Exception]:
+            try:
+                return get_chunk(chunk)
+            except Exception as e:
+                return e
+
+        if not chunks:
+            return BulkResult(forecasts={}, failures={})
+        workers = min(max_workers or self._pool_size, len(chunks))
+        with _thread_pool(max_workers=workers) as executor:
+            results = list(executor.map(get, chunks))
+        return _merge_chunks(chunks, results)
+
+    def get_forecasts_by_id(self,
+                            city_ids: typing.Iterable[int],
+                            units: Units = Units.METRIC,
+                            chunk_size: typing.Optional[int] = None,
+                            max_workers: typing.Optional[int] = None,
+                            priority: Priority = Priority.NORMAL,
+                            use_cache: bool = True) -> BulkResult:
+        """get the current weather of any number of cities by city id
+
+        like get_multiple_forecasts, but forecasts maps every city id to its forecast
+        in the order of city_ids, so the cities of the same name don't hide each
+        other. with a cache the cached cities are taken from it and only the missing
+        ones are fetched, in as few chunks as possible.
+        """
+        city_ids = list(dict.fromkeys(int(c_id) for c_id in city_ids))
+        city_forecasts, missing = {}, city_ids
+        if use_cache and self.cache is not None:
+            city_forecasts, missing = self._get_cached_group(city_ids, Units.STANDARD)
+
+        fetched = self._get_chunks(
+            _chunk_city_ids(missing, chunk_size),
+            lambda chunk: self._get_group(chunk, Units.STANDARD, priority), max_workers)
+        city_forecasts.update(fetched.forecasts)
+        forecasts = {c_id: city_forecasts[c_id] for c_id in city_ids if c_id in city_forecasts}
+        return BulkResult(forecasts=_in_units(forecasts, ForecastType.MULTIPLE, units),
+                          failures=fetched.failures)
+
+    def _get_region(self, cities: typing.List['City'], lat: float, lon: float, units: Units,
+                    limit: typing.Optional[int], **kwargs) -> RegionResult:
+        from open_weather_api.geo import distance_km
+
+        cities = cities[:limit] if limit is not None else cities
+        bulk = self.get_forecasts_by_id([city.id for city in cities], units, **kwargs)
+        forecasts = [RegionForecast(city, distance_km(lat, lon, city.lat, city.lon),
+                                    bulk.forecasts[city.id])
+                     for city in cities if city.id in bulk.forecasts]
+        return RegionResult(forecasts=forecasts, failures=bulk.failures)
+
+    def get_forecasts_in_radius(self,
+                                lat: float,
+                                lon: float,
+                                radius_km: float,
+                                units: Units = Units.METRIC,
+                                limit: typing.Optional[int] = None,
+                                chunk_size: typing.Optional[int] = None,
+                                max_workers: typing.Optional[int] = None,
+                                priority: Priority = Priority.NORMAL) -> RegionResult:
+        """get the current weather of the cities of the city index within radius_km
+
+        the cities are fetched like get_forecasts_by_id, so with a cache the queries of
+        overlapping regions only fetch the cities that aren't cached yet. limit keeps
+        only the limit nearest cities.
+        """
+        cities = self._require_city_index().within_radius(lat, lon, radius_km)
+        return self._get_region(cities, lat, lon, units, limit, chunk_size=chunk_size,
+                                max_workers=max_workers, priority=priority)
+
+    def get_forecasts_in_bbox(self,
+                              south: float,
+                              west: float,
+                              north: float,
+                              east: float,
+                              units: Units = Units.METRIC,
+                              limit: typing.Optional[int] = None,
+                              chunk_size: typing.Optional[int] = None,
+                              max_workers: typing.Optional[int] = None,
+                              priority: Priority = Priority.NORMAL) -> RegionResult:
+        """get the current weather of the cities of the city index inside a bounding box
+
+        like get_forecasts_in_radius, ordered by the distance from the center of the
+        box. west > east is a box crossing the antimeridian.
+        """
+        from open_weather_api.geo import bbox_center
+
+        cities = self._require_city_index().within_bbox(south, west, north, east)
+        lat, lon = bbox_center(south, west, north, east)
+        return self._get_region(cities, lat, lon, units, limit, chunk_size=chunk_size,
+                                max_workers=max_workers, priority=priority)
+
+    def get_multiple_forecasts(self,
+                               city_ids: typing.Iterable[int],
+                               units: Units = Units.METRIC,
+                               chunk_size: typing.Optional[int] = None,
+                               max_workers: typing.Optional[int] = None,
+                               priority: Priority = Priority.NORMAL) -> BulkResult:
+        """get the current weather of any number of cities
+
+        the ids are split to chunks of chunk_size (config.GROUP_MAX_IDS by default)
+        that are fetched concurrently by max_workers threads (pool_size by default).
+        a failed chunk is reported in the failures of the result and doesn't stop
+        the other chunks. like get_forecasts_by_id, with the forecasts keyed by city
+        name.
+        """
+        bulk = self.get_forecasts_by_id(city_ids, units, chunk_size, max_workers, priority)
+        return BulkResult(forecasts={forecast['city_name']: forecast
+                                     for forecast in bulk.forecasts.values()},
+                          failures=bulk.failures)
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> OpenWeatherClient:
+    """get the client shared by the module level functions, creating it on first use"""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = OpenWeatherClient()
+    return _default_client
+
+
+def set_default_client(client: typing.Optional[OpenWeatherClient]) -> None:
+    """replace the client shared by the module level functions, None resets it"""
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
+
+
+def get_city_forecast(city_id: typing.Union[int, typing.List],
+                      forecast_type: ForecastType = ForecastType.CURRENT,
+                      units: Units = Units.METRIC,
+                      use_cache: bool = True,
+                      priority: Priority = Priority.NORMAL) -> typing.Mapping:
+    """get the weather of city_id city for forecast_type type"""
+    return get_default_client().get_city_forecast(city_id, forecast_type, units, use_cache,
+                                                  priority)
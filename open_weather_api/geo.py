@@ -0,0 +1,329 @@
+from array import array
+import bisect
+import gzip
+import heapq
+import math
+import mmap
+import struct
+import sys
+import typing
+import unicodedata
+
+from open_weather_api import decoding
+
+EARTH_RADIUS_KM = 6371.0088
+
+_MAGIC = b'OWCI'
+_VERSION = 1
+# magic, version, little endian flag, number of cities, size of the names and keys
+_HEADER = struct.Struct('<4sHHQQQ')
+
+
+class City(typing.NamedTuple):
+    id: int
+    name: str
+    country: str
+    lat: float
+    lon: float
+
+
+def _name_key(name: str) -> str:
+    # names are matched without case and accents, "zurich" finds Zürich
+    decomposed = unicodedata.normalize('NFKD', name)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def _to_xyz(lat: float, lon: float) -> typing.Tuple[float, float, float]:
+    lat, lon = math.radians(lat), math.radians(lon)
+    return math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """great circle distance between two points"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bbox_center(south: float, west: float, north: float,
+                east: float) -> typing.Tuple[float, float]:
+    """the center of a bounding box, west > east crosses the antimeridian"""
+    if west > east:
+        east += 360
+    lon = (west + east) / 2
+    return (south + north) / 2, lon - 360 if lon > 180 else lon
+
+
+def _in_bbox(city: City, south: float, west: float, north: float, east: float) -> bool:
+    if not south <= city.lat <= north:
+        return False
+    if west <= east:
+        return west <= city.lon <= east
+    return city.lon >= west or city.lon <= east
+
+
+def _kd_order(xyz: typing.List[typing.Tuple[float, float, float]]) -> typing.List[int]:
+    # lays the points out as an implicit k-d tree: the node of the range lo:hi is
+    # its middle position (lo + hi) // 2, split on the axis depth % 3
+    order = list(range(len(xyz)))
+    stack = [(0, len(order), 0)]
+    while stack:
+        lo, hi, axis = stack.pop()
+        if hi - lo <= 1:
+            continue
+        order[lo:hi] = sorted(order[lo:hi], key=lambda i: xyz[i][axis])
+        mid = (lo + hi) // 2
+        stack.append((lo, mid, (axis + 1) % 3))
+        stack.append((mid + 1, hi, (axis + 1) % 3))
+    return order
+
+
+def _pad(size: int) -> int:
+    return -size % 8
+
+
+class _SortedKeys:
+    """the name keys in name_order, a sequence bisect can search"""
+
+    def __init__(self, index: 'CityIndex') -> None:
+        self._index = index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, i: int) -> str:
+        return self._index._key(self._index._name_order[i])
+
+
+class _SortedIds:
+    def __init__(self, index: 'CityIndex') -> None:
+        self._index = index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, i: int) -> int:
+        return self._index._ids[self._index._id_order[i]]
+
+
+class CityIndex:
+    """compact read only index of the cities of open weather
+
+    answers the nearest cities of a point (an implicit k-d tree over the cities as
+    points on the unit sphere) and the cities of a name (binary search of the names
+    without case and accents) in microseconds, without a python object per city.
+    build it once from the city list of open weather (from_city_list), save it and
+    open it with open, which maps the file to memory instead of reading it, so the
+    startup doesn't depend on the number of cities and processes share the pages.
+    """
+
+    def __init__(self, buffer: typing.Any) -> None:
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, version, little_endian, count, names_size, keys_size = \
+            _HEADER.unpack_from(view)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('not a city index of this version')
+        if bool(little_endian) != (sys.byteorder == 'little'):
+            raise ValueError('the city index was built on a machine of another byte order')
+
+        self._count = count
+        offset = _HEADER.size + _pad(_HEADER.size)
+
+        def section(code: str, length: int) -> memoryview:
+            nonlocal offset
+            size = length * struct.calcsize(code)
+            part = view[offset:offset + size].cast(code)
+            offset += size + _pad(size)
+            return part
+
+        self._ids = section('q', count)
+        self._coords = section('d', 2 * count)
+        self._xyz = section('f', 3 * count)
+        self._countries = section('B', 2 * count)
+        self._name_offsets = section('I', count + 1)
+        self._names = section('B', names_size)
+        self._key_offsets = section('I', count + 1)
+        self._keys = section('B', keys_size)
+        self._name_order = section('I', count)
+        self._id_order = section('I', count)
+
+    @classmethod
+    def from_cities(cls, cities: typing.Iterable[City]) -> 'CityIndex':
+        """build an index in memory"""
+        cities = list(cities)
+        xyz = [_to_xyz(city.lat, city.lon) for city in cities]
+        cities = [cities[i] for i in _kd_order(xyz)]
+
+        names = [city.name.encode() for city in cities]
+        keys = [_name_key(city.name) for city in cities]
+        name_order = sorted(range(len(cities)),
+                            key=lambda i: (keys[i], cities[i].country, cities[i].id))
+        id_order = sorted(range(len(cities)), key=lambda i: cities[i].id)
+        keys = [key.encode() for key in keys]
+
+        def offsets(blobs: typing.List[bytes]) -> array:
+            positions = array('I', [0])
+            for blob in blobs:
+                positions.append(positions[-1] + len(blob))
+            return positions
+
+        sections = [
+            array('q', (city.id for city in cities)).tobytes(),
+            array('d', (value for city in cities for value in (city.lat, city.lon))).tobytes(),
+            array('f', (value for city in cities
+                        for value in _to_xyz(city.lat, city.lon))).tobytes(),
+            b''.join(city.country.encode('ascii').ljust(2)[:2] for city in cities),
+            offsets(names).tobytes(),
+            b''.join(names),
+            offsets(keys).tobytes(),
+            b''.join(keys),
+            array('I', name_order).tobytes(),
+            array('I', id_order).tobytes(),
+        ]
+        header = _HEADER.pack(_MAGIC, _VERSION, sys.byteorder == 'little', len(cities),
+                              len(sections[5]), len(sections[7]))
+        buffer = bytearray(header + bytes(_pad(len(header))))
+        for part in sections:
+            buffer += part + bytes(_pad(len(part)))
+        return cls(bytes(buffer))
+
+    @classmethod
+    def from_city_list(cls, path: str) -> 'CityIndex':
+        """build an index from city.list.json(.gz) of open weather"""
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            cities = decoding.loads(f.read())
+        return cls.from_cities(City(city['id'], city['name'], city['country'],
+                                    city['coord']['lat'], city['coord']['lon'])
+                               for city in cities)
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as f:
+            f.write(self._buffer)
+
+    @classmethod
+    def open(cls, path: str) -> 'CityIndex':
+        """map a saved index to memory"""
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _key(self, position: int) -> str:
+        return bytes(self._keys[self._key_offsets[position]:
+                                self._key_offsets[position + 1]]).decode()
+
+    def _city(self, position: int) -> City:
+        name = bytes(self._names[self._name_offsets[position]:
+                                 self._name_offsets[position + 1]]).decode()
+        country = bytes(self._countries[2 * position:2 * position + 2]).decode().strip()
+        return City(self._ids[position], name, country,
+                    self._coords[2 * position], self._coords[2 * position + 1])
+
+    def get(self, city_id: int) -> typing.Optional[City]:
+        """the city of city_id, None when it isn't in the index"""
+        i = bisect.bisect_left(_SortedIds(self), city_id)
+        if i < self._count and self._ids[self._id_order[i]] == city_id:
+            return self._city(self._id_order[i])
+        return None
+
+    def find(self, name: str, country: typing.Optional[str] = None) -> typing.List[City]:
+        """the cities called name (without case and accents), of country when given,
+        ordered by country and id"""
+        key = _name_key(name)
+        keys = _SortedKeys(self)
+        cities = []
+        i = bisect.bisect_left(keys, key)
+        while i < self._count and keys[i] == key:
+            city = self._city(self._name_order[i])
+            if country is None or city.country == country.upper():
+                cities.append(city)
+            i += 1
+        return cities
+
+    def nearest(self, lat: float, lon: float, count: int = 1) -> typing.List[City]:
+        """the count cities nearest to the point, the nearest first"""
+        if count < 1:
+            raise ValueError('count must be a positive number')
+        point = _to_xyz(lat, lon)
+        xyz = self._xyz
+        found = []  # a max heap of (-squared chord distance, position)
+
+        def search(lo: int, hi: int, axis: int) -> None:
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            x, y, z = xyz[3 * mid], xyz[3 * mid + 1], xyz[3 * mid + 2]
+            d2 = (point[0] - x) ** 2 + (point[1] - y) ** 2 + (point[2] - z) ** 2
+            if len(found) < count:
+                heapq.heappush(found, (-d2, mid))
+            elif d2 < -found[0][0]:
+                heapq.heapreplace(found, (-d2, mid))
+
+            diff = point[axis] - xyz[3 * mid + axis]
+            next_axis = (axis + 1) % 3
+            if diff < 0:
+                search(lo, mid, next_axis)
+                if len(found) < count or diff * diff < -found[0][0]:
+                    search(mid + 1, hi, next_axis)
+            else:
+                search(mid + 1, hi, next_axis)
+                if len(found) < count or diff * diff < -found[0][0]:
+                    search(lo, mid, next_axis)
+
+        search(0, self._count, 0)
+        return [self._city(position) for _, position in sorted(found, reverse=True)]
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> typing.List[City]:
+        """the cities at most radius_km from the point, the nearest first"""
+        point = _to_xyz(lat, lon)
+        # the straight line (chord) distance of radius_km on the surface, with a margin
+        # of some meters for the rounding of the float32 points
+        chord = 2 * math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2)
+        max_d2 = (chord + 1e-6) ** 2
+        xyz = self._xyz
+        found = []
+        stack = [(0, self._count, 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            x, y, z = xyz[3 * mid], xyz[3 * mid + 1], xyz[3 * mid + 2]
+            d2 = (point[0] - x) ** 2 + (point[1] - y) ** 2 + (point[2] - z) ** 2
+            if d2 <= max_d2:
+                found.append((d2, mid))
+
+            diff = point[axis] - xyz[3 * mid + axis]
+            next_axis = (axis + 1) % 3
+            if diff <= 0 or diff * diff <= max_d2:
+                stack.append((lo, mid, next_axis))
+            if diff >= 0 or diff * diff <= max_d2:
+                stack.append((mid + 1, hi, next_axis))
+
+        found.sort()
+        cities = (self._city(position) for _, position in found)
+        return [city for city in cities
+                if distance_km(lat, lon, city.lat, city.lon) <= radius_km]
+
+    def within_bbox(self, south: float, west: float, north: float,
+                    east: float) -> typing.List[City]:
+        """the cities inside the bounding box, the nearest to its center first
+
+        west > east is a box crossing the antimeridian
+        """
+        if south > north:
+            raise ValueError('south must not be north of north')
+        lat, lon = bbox_center(south, west, north, east)
+        span = (east - west) % 360 or (360 if west != east else 0)
+        if span > 180:
+            radius_km = math.pi * EARTH_RADIUS_KM
+        else:
+            # the farthest points of a box smaller than a hemisphere are its corners
+            radius_km = max(distance_km(lat, lon, corner_lat, corner_lon)
+                            for corner_lat in (south, north) for corner_lon in (west, east))
+        return [city for city in self.within_radius(lat, lon, radius_km + 1)
+                if _in_bbox(city, south, west, north, east)]
@@ -0,0 +1,122 @@
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    from open_weather_api.fetch_weather import ForecastType, Units
+
+# the outcomes of a cache lookup given to Instrumentation.on_cache
+CACHE_HIT = 'hit'
+CACHE_STALE = 'stale'
+CACHE_MISS = 'miss'
+
+
+class CallMetrics:
+    """the measures of one upstream call, given to Instrumentation.on_call when it ends
+
+    phases maps the phases of the call to the seconds they took, in order:
+    rate_limit (waiting for a token, only with a rate limiter), response (connecting,
+    sending and waiting for the headers, retries included), download (reading the
+    body), decode (json) and parse (building the records).
+    a streamed call has no decode and parse phases, its download also holds the
+    time the caller spent on the records while the body was read.
+    status_code, response_size and retries are None when no answer came, error is
+    the exception of a failed call.
+    """
+    __slots__ = ('forecast_type', 'units', 'phases', 'status_code', 'response_size',
+                 'retries', 'error', '_last')
+
+    def __init__(self, forecast_type: 'ForecastType', units: 'Units') -> None:
+        self.forecast_type = forecast_type
+        self.units = units
+        self.phases = {}
+        self.status_code = None
+        self.response_size = None
+        self.retries = None
+        self.error = None
+        self._last = time.perf_counter()
+
+    def mark(self, phase: str) -> None:
+        """end phase, it took the time since the previous mark"""
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+
+    def mark_response(self, headers_seconds: float) -> None:
+        """end the response and download phases of a request that read the whole body,
+        the first headers_seconds of it were until the headers came"""
+        now = time.perf_counter()
+        response = min(headers_seconds, now - self._last)
+        self.phases['response'] = response
+        self.phases['download'] = now - self._last - response
+        self._last = now
+
+    @property
+    def duration(self) -> float:
+        return sum(self.phases.values())
+
+
+class Instrumentation:
+    """hooks called by the clients on every upstream call and cache lookup
+
+    subclass it and override the hooks to feed metrics or tracing, see
+    PrometheusInstrumentation. the hooks run in the thread of the call so they
+    must be fast and thread safe, an exception they raise fails the call.
+    a client without instrumentation doesn't measure anything.
+    """
+
+    def on_call(self, call: CallMetrics) -> None:
+        """an upstream call ended, successfully or not"""
+
+    def on_cache(self, forecast_type: 'ForecastType', units: 'Units', outcome: str) -> None:
+        """a forecast was looked up in the cache, outcome is CACHE_HIT, CACHE_STALE or
+        CACHE_MISS. for ForecastType.MULTIPLE it is called for every city"""
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """exports the measures of the calls as prometheus metrics
+
+    the metrics are labeled by forecast_type and units and registered in registry
+    (the default registry of prometheus_client by default) with namespace as prefix.
+    needs the prometheus extra installed (pip install open-weather-client[prometheus]).
+    """
+
+    def __init__(self, registry: typing.Any = None, namespace: str = 'open_weather') -> None:
+        # imported here, it is slow to import and the clients import this module
+        try:
+            import prometheus_client
+        except ImportError:  # pragma: no cover - depends on the installed extras
+            raise ImportError('PrometheusInstrumentation needs prometheus_client, install it '
+                              'with pip install open-weather-client[prometheus]') from None
+        registry = registry if registry is not None else prometheus_client.REGISTRY
+        labels = ('forecast_type', 'units')
+
+        self.calls = prometheus_client.Counter(
+            'upstream_calls', 'upstream calls by status code (error when none came)',
+            labels + ('status',), namespace=namespace, registry=registry)
+        self.phase_seconds = prometheus_client.Histogram(
+            'upstream_phase_seconds', 'seconds spent in every phase of the upstream calls',
+            labels + ('phase',), namespace=namespace, registry=registry)
+        self.response_bytes = prometheus_client.Histogram(
+            'upstream_response_bytes', 'size of the upstream answers', labels,
+            namespace=namespace, registry=registry,
+            buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, float('inf')))
+        self.retries = prometheus_client.Counter(
+            'upstream_retries', 'retries done by the upstream calls', labels,
+            namespace=namespace, registry=registry)
+        self.cache_lookups = prometheus_client.Counter(
+            'cache_lookups', 'cache lookups by outcome (hit, stale or miss)',
+            labels + ('outcome',), namespace=namespace, registry=registry)
+
+    def on_call(self, call: CallMetrics) -> None:
+        labels = (call.forecast_type.name, call.units.name)
+        status = str(call.status_code) if call.status_code is not None else 'error'
+        self.calls.labels(*labels, status).inc()
+        for phase, seconds in call.phases.items():
+            self.phase_seconds.labels(*labels, phase).observe(seconds)
+        if call.response_size is not None:
+            self.response_bytes.labels(*labels).observe(call.response_size)
+        if call.retries:
+            self.retries.labels(*labels).inc(call.retries)
+
+    def on_cache(self, forecast_type: 'ForecastType', units: 'Units', outcome: str) -> None:
+        self.cache_lookups.labels(forecast_type.name, units.name, outcome).inc()
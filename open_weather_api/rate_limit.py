@@ -0,0 +1,126 @@
+from datetime import datetime, timezone
+from enum import Enum
+import heapq
+import itertools
+import threading
+import time
+import typing
+
+from open_weather_api.exceptions import QuotaExceeded, RateLimitExceeded
+
+
+class Priority(Enum):
+    HIGH = 1
+    NORMAL = 2
+    LOW = 3
+
+
+DEFAULT_MAX_WAIT = {
+    Priority.HIGH: None,
+    Priority.NORMAL: 30,
+    Priority.LOW: 0,
+}
+
+
+class QuotaState(typing.NamedTuple):
+    tokens: float
+    waiting: int
+    month_calls: int
+    month_remaining: typing.Optional[int]
+
+
+def _current_month() -> typing.Tuple[int, int]:
+    now = datetime.now(timezone.utc)
+    return now.year, now.month
+
+
+class RateLimiter:
+    """token bucket pacing the calls to the open weather api
+
+    the bucket holds up to burst tokens and is refilled with calls_per_minute tokens
+    a minute, every call takes one token. callers waiting for a token are served by
+    priority and then by arrival. a caller that would wait longer than the max_wait
+    of its priority (DEFAULT_MAX_WAIT updated by max_wait, None waits forever) is
+    shed with RateLimitExceeded. with monthly_quota the calls of the calendar month
+    are counted and the calls over the quota raise QuotaExceeded.
+    """
+
+    def __init__(self,
+                 calls_per_minute: float = 60,
+                 burst: typing.Optional[int] = None,
+                 monthly_quota: typing.Optional[int] = None,
+                 max_wait: typing.Optional[typing.Dict[Priority, typing.Optional[float]]] = None,
+                 clock: typing.Callable[[], float] = time.monotonic) -> None:
+        if calls_per_minute <= 0:
+            raise ValueError('calls_per_minute must be a positive number')
+        self.rate = calls_per_minute / 60
+        self.burst = burst if burst is not None else max(1, int(calls_per_minute))
+        self.monthly_quota = monthly_quota
+        self.max_wait = dict(DEFAULT_MAX_WAIT)
+        if max_wait:
+            self.max_wait.update(max_wait)
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated_at = clock()
+        self._month = _current_month()
+        self._month_calls = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def _take_quota(self) -> None:
+        if self.monthly_quota is None:
+            return
+        month = _current_month()
+        if month != self._month:
+            self._month = month
+            self._month_calls = 0
+        if self._month_calls >= self.monthly_quota:
+            raise QuotaExceeded(f'the monthly quota of {self.monthly_quota} calls is used up')
+        self._month_calls += 1
+
+    @property
+    def state(self) -> QuotaState:
+        """the tokens left in the bucket, the waiting callers and the monthly usage"""
+        with self._condition:
+            self._refill()
+            remaining = None
+            if self.monthly_quota is not None:
+                remaining = max(0, self.monthly_quota - self._month_calls)
+            return QuotaState(self._tokens, len(self._waiters), self._month_calls, remaining)
+
+    def acquire(self, priority: Priority = Priority.NORMAL) -> None:
+        """take a token, waiting for it up to the max_wait of priority"""
+        max_wait = self.max_wait[priority]
+        with self._condition:
+            waiter = (priority.value, next(self._sequence))
+            heapq.heappush(self._waiters, waiter)
+            deadline = None if max_wait is None else self._clock() + max_wait
+            try:
+                while True:
+                    self._refill()
+                    if self._waiters[0] == waiter and self._tokens >= 1:
+                        self._take_quota()
+                        self._tokens -= 1
+                        return
+
+                    wait = (1 - self._tokens) / self.rate if self._tokens < 1 else None
+                    if deadline is not None:
+                        remaining = deadline - self._clock()
+                        # shed right away when the token can't come in time
+                        if remaining <= 0 or (wait is not None and wait > remaining
+                                              and self._waiters[0] == waiter):
+                            raise RateLimitExceeded(
+                                f'no token for a {priority.name} priority call '
+                                f'within {max_wait} seconds')
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
@@ -0,0 +1,227 @@
+from collections.abc import Mapping
+from datetime import datetime, timezone
+import sys
+import typing
+
+
+def _timestamp_property(slot: str, doc: str) -> property:
+    def getter(self) -> datetime:
+        return datetime.fromtimestamp(getattr(self, slot), tz=timezone.utc)
+
+    return property(getter, doc=doc)
+
+
+# the datetime keys of the dict view and the timestamp slots they are made of
+_TIMESTAMP_SLOTS = {
+    'forecast_time': 'dt',
+    'sunrise_time': 'sunrise',
+    'sunset_time': 'sunset',
+}
+
+
+def _to_datetime(timestamp: int, converted: typing.Dict[int, datetime]) -> datetime:
+    value = converted.get(timestamp)
+    if value is None:
+        value = converted[timestamp] = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    return value
+
+
+class _Record(Mapping):
+    """slotted forecast record that can be read like the dict the parsers used to return
+
+    the timestamps are kept as ints and the *_time datetimes are created when read.
+    _keys are the keys of the dict view, in order. the keys of _optional are left out
+    of it while their value is None. _temperatures and _speeds are the slots holding
+    temperatures and wind speeds. _in_units(temperature, speed) is a copy of the record
+    with them converted by the two functions, generated for every subclass that doesn't
+    define its own.
+    the records can be shared, like by a cache, and must not be changed, _replace
+    makes a changed copy.
+    """
+    __slots__ = ()
+    _keys = ()
+    _optional = ()
+    _temperatures = ()
+    _speeds = ()
+
+    forecast_time = _timestamp_property('dt', 'the time of the forecast')
+    sunrise_time = _timestamp_property('sunrise', 'the sunrise time')
+    sunset_time = _timestamp_property('sunset', 'the sunset time')
+
+    def __init_subclass__(cls, writable: bool = False, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        if writable:
+            return
+        # records are built in the parsing hot path, where a loop of object.__setattr__
+        # is several times slower than assigning the slots by name. the generated
+        # __new__ assigns them on a writable twin of the class, of the same layout,
+        # and turns it into the read only class
+        twin = type(cls.__name__, (cls,), {'__slots__': (),
+                                           '__setattr__': object.__setattr__,
+                                           '__delattr__': object.__delattr__},
+                    writable=True)
+        body = ''.join(f'    self.{slot} = {slot}\n' for slot in cls.__slots__)
+        namespace = {'cls': cls, 'twin': twin, 'new': object.__new__,
+                     'setattr': object.__setattr__}
+        exec(f'def __new__(record_cls, {", ".join(cls.__slots__)}):\n'
+             f'    self = new(twin)\n{body}'
+             f'    setattr(self, "__class__", record_cls)\n'
+             f'    return self\n', namespace)
+        cls.__new__ = namespace['__new__']
+        if '_in_units' not in vars(cls):
+            # the same for converting the units, done for every record a client returns
+            values = ', '.join(
+                f'temperature(self.{slot})' if slot in cls._temperatures else
+                f'speed(self.{slot})' if slot in cls._speeds else f'self.{slot}'
+                for slot in cls.__slots__)
+            exec(f'def _in_units(self, temperature, speed):\n    return cls({values})\n',
+                 namespace)
+            cls._in_units = namespace['_in_units']
+
+    def __getitem__(self, key: str) -> typing.Any:
+        if key not in self._keys:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None and key in self._optional:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> typing.Iterator[str]:
+        if not self._optional:
+            return iter(self._keys)
+        return (key for key in self._keys
+                if key not in self._optional or getattr(self, key) is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        values = ', '.join(f'{slot}={getattr(self, slot)!r}' for slot in self.__slots__)
+        return f'{type(self).__name__}({values})'
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        raise AttributeError(f'{type(self).__name__} is read only, use _replace')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f'{type(self).__name__} is read only, use _replace')
+
+    def __reduce__(self) -> typing.Tuple:
+        return type(self), tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def _replace(self, **changes) -> '_Record':
+        """a copy of the record with the slots in changes replaced"""
+        return type(self)(*(changes.pop(slot, getattr(self, slot)) for slot in self.__slots__))
+
+    def to_dict(self, _converted: typing.Optional[typing.Dict[int, datetime]] = None
+                ) -> typing.Dict:
+        """the record as a plain dict, like the parsers used to return"""
+        # _converted is shared by the records of a batch, so a timestamp repeated in
+        # them (like the dt of the cities of a group) is converted once
+        converted = _converted if _converted is not None else {}
+        values = {}
+        for key in self:
+            slot = _TIMESTAMP_SLOTS.get(key)
+            if slot is not None:
+                values[key] = _to_datetime(getattr(self, slot), converted)
+            else:
+                values[key] = getattr(self, key)
+        return values
+
+
+class CurrentForecast(_Record):
+    """the current weather of a city
+
+    rain and snow are None for the cities of a group answer, which doesn't report them
+    """
+    __slots__ = ('main', 'description', 'current_temp', 'min_temp', 'max_temp', 'feels_like',
+                 'humidity', 'pressure', 'wind_speed', 'wind_direction', 'clouds',
+                 'city_name', 'country', 'dt', 'sunrise', 'sunset', 'rain', 'snow')
+    _keys = ('main', 'description', 'current_temp', 'min_temp', 'max_temp', 'feels_like',
+             'humidity', 'pressure', 'wind_speed', 'wind_direction', 'clouds',
+             'city_name', 'country', 'forecast_time', 'sunrise_time', 'sunset_time',
+             'rain', 'snow')
+    _optional = ('rain', 'snow')
+    _temperatures = ('current_temp', 'min_temp', 'max_temp', 'feels_like')
+    _speeds = ('wind_speed',)
+
+    @classmethod
+    def from_json(cls, forecast_data: typing.Dict,
+                  precipitation: bool = True) -> 'CurrentForecast':
+        """build the record from the json of a city in the weather or group apis"""
+        weather = forecast_data['weather'][0]
+        main = forecast_data['main']
+        wind = forecast_data['wind']
+        sys_data = forecast_data['sys']
+        rain = snow = None
+        if precipitation:
+            # the rain and snow of the last hour, an answer can report only the last 3h
+            rain = forecast_data.get('rain', {}).get('1h', 0)
+            snow = forecast_data.get('snow', {}).get('1h', 0)
+
+        return cls(sys.intern(weather['main']), sys.intern(weather['description']),
+                   main['temp'], main['temp_min'], main['temp_max'], main['feels_like'],
+                   main['humidity'], main['pressure'], wind['speed'], wind['deg'],
+                   forecast_data['clouds']['all'], forecast_data['name'],
+                   sys.intern(sys_data['country']), forecast_data['dt'],
+                   sys_data['sunrise'], sys_data['sunset'], rain, snow)
+
+
+class DailyForecast(_Record):
+    """the forecast of a city for one day"""
+    __slots__ = ('dt', 'sunrise', 'sunset', 'day_temp', 'max_temp', 'min_temp', 'night_temp',
+                 'eve_temp', 'morning_temp', 'day_feels_like', 'night_feels_like',
+                 'eve_feels_like', 'morning_feels_like', 'pressure', 'humidity', 'main',
+                 'description', 'wind_speed', 'wind_direction', 'precipitation_probability',
+                 'rain', 'snow')
+    _keys = ('forecast_time', 'sunrise_time', 'sunset_time') + __slots__[3:]
+    _temperatures = __slots__[3:13]
+    _speeds = ('wind_speed',)
+
+    @classmethod
+    def from_json(cls, forecast_day: typing.Dict) -> 'DailyForecast':
+        """build the record from the json of a day in the forecast/daily api"""
+        temp = forecast_day['temp']
+        feels_like = forecast_day['feels_like']
+        weather = forecast_day['weather'][0]
+
+        return cls(forecast_day['dt'], forecast_day['sunrise'], forecast_day['sunset'],
+                   temp['day'], temp['max'], temp['min'], temp['night'], temp['eve'],
+                   temp['morn'], feels_like['day'], feels_like['night'], feels_like['eve'],
+                   feels_like['morn'], forecast_day['pressure'], forecast_day['humidity'],
+                   sys.intern(weather['main']), sys.intern(weather['description']),
+                   forecast_day['speed'], forecast_day['deg'], forecast_day['pop'],
+                   forecast_day.get('rain', 0), forecast_day.get('snow', 0))
+
+
+class CityForecasts(_Record):
+    """the daily forecasts of a city"""
+    __slots__ = ('city_name', 'country', 'forecasts')
+    _keys = __slots__
+
+    @classmethod
+    def from_json(cls, forecast_data: typing.Dict) -> 'CityForecasts':
+        """build the record from the json of the forecast/daily api"""
+        return cls(forecast_data['city']['name'], sys.intern(forecast_data['city']['country']),
+                   [DailyForecast.from_json(forecast_day)
+                    for forecast_day in forecast_data['list']])
+
+    def _in_units(self, temperature: typing.Callable[[float], float],
+                  speed: typing.Callable[[float], float]) -> 'CityForecasts':
+        return CityForecasts(self.city_name, self.country,
+                             [day._in_units(temperature, speed) for day in self.forecasts])
+
+    def to_dict(self, _converted: typing.Optional[typing.Dict[int, datetime]] = None
+                ) -> typing.Dict:
+        return {
+            'city_name': self.city_name,
+            'country': self.country,
+            'forecasts': to_dicts(self.forecasts, _converted),
+        }
+
+
+def to_dicts(records: typing.Iterable[_Record],
+             _converted: typing.Optional[typing.Dict[int, datetime]] = None
+             ) -> typing.List[typing.Dict]:
+    """the records as plain dicts, converting every distinct timestamp of them once"""
+    converted = _converted if _converted is not None else {}
+    return [record.to_dict(converted) for record in records]
@@ -0,0 +1,127 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+import typing
+
+from open_weather_api import config
+from open_weather_api.fetch_weather import (
+    _chunk_city_ids,
+    ForecastType,
+    OpenWeatherClient,
+    Units,
+)
+from open_weather_api.rate_limit import Priority
+
+logger = logging.getLogger(__name__)
+
+
+class _RefreshJob(typing.NamedTuple):
+    forecast_type: ForecastType
+    city_id: typing.Union[int, typing.List[int]]
+    interval: float
+
+
+class HotCityRefresher:
+    """keeps the forecasts of a known set of cities fresh in the cache of client
+
+    the current weather is refreshed by group calls of config.GROUP_MAX_IDS cities
+    every current_interval seconds and with daily the 16 days forecasts are refreshed
+    every daily_interval seconds. by default the intervals are refresh_ahead of the
+    ttls of the cache, so the entries are replaced before they expire and the
+    foreground calls for these cities never fetch. the group answers don't report
+    rain and snow, so they serve the ForecastType.MULTIPLE calls and
+    get_forecasts_by_id, and a ForecastType.CURRENT call still fetches the city.
+    the refreshes of every kind are spread evenly over their interval instead of
+    running all at once. the cache keeps the forecasts in one units for all the units
+    the client is asked for, so they are refreshed once.
+    """
+
+    def __init__(self,
+                 client: OpenWeatherClient,
+                 city_ids: typing.Iterable[int],
+                 daily: bool = True,
+                 current_interval: typing.Optional[float] = None,
+                 daily_interval: typing.Optional[float] = None,
+                 refresh_ahead: float = 0.8,
+                 priority: Priority = Priority.NORMAL,
+                 clock: typing.Callable[[], float] = time.monotonic) -> None:
+        if client.cache is None:
+            raise ValueError('the client of a HotCityRefresher must have a cache')
+        self.client = client
+        self.priority = priority
+        self._clock = clock
+        self._stop = threading.Event()
+        self._thread = None
+
+        cache = client.cache
+        # the cities fetched by group calls are cached with the ttl of MULTIPLE
+        current_interval = current_interval or cache.ttl_for(ForecastType.MULTIPLE) * refresh_ahead
+        daily_interval = daily_interval or cache.ttl_for(ForecastType.DAILY_16) * refresh_ahead
+
+        city_ids = list(dict.fromkeys(city_ids))
+        jobs = [[_RefreshJob(ForecastType.MULTIPLE, chunk, current_interval)
+                 for chunk in _chunk_city_ids(city_ids, config.GROUP_MAX_IDS)]]
+        if daily:
+            jobs.append([_RefreshJob(ForecastType.DAILY_16, c_id, daily_interval)
+                         for c_id in city_ids])
+
+        now = clock()
+        self._sequence = itertools.count()
+        self._schedule = []
+        for kind_jobs in jobs:
+            for i, job in enumerate(kind_jobs):
+                offset = i * job.interval / len(kind_jobs)
+                heapq.heappush(self._schedule, (now + offset, next(self._sequence), job))
+
+    def _run_job(self, job: _RefreshJob) -> None:
+        try:
+            # the units the forecasts are cached in, so nothing is converted
+            self.client.get_city_forecast(job.city_id, job.forecast_type, Units.STANDARD,
+                                          use_cache=False, priority=self.priority)
+        except Exception:
+            logger.warning('refreshing %s %s failed', job.forecast_type.name, job.city_id,
+                           exc_info=True)
+
+    def next_run(self) -> float:
+        """the clock time of the next refresh"""
+        return self._schedule[0][0]
+
+    def run_pending(self) -> int:
+        """run the refreshes that are due and return their number"""
+        ran = 0
+        while self._schedule and self._schedule[0][0] <= self._clock():
+            due, _, job = heapq.heappop(self._schedule)
+            self._run_job(job)
+            heapq.heappush(self._schedule, (due + job.interval, next(self._sequence), job))
+            ran += 1
+        return ran
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.run_pending()
+            timeout = max(0, self.next_run() - self._clock()) if self._schedule else None
+            self._stop.wait(timeout)
+
+    def start(self) -> None:
+        """start refreshing in a background thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='hot-city-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """stop the background thread, waiting for the running refresh"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'HotCityRefresher':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
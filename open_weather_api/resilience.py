@@ -0,0 +1,89 @@
+from enum import Enum
+import random
+import threading
+import time
+import typing
+
+from urllib3.util.retry import Retry
+
+from open_weather_api.exceptions import CircuitOpenError
+
+# the answers retried by the client and counted as failures by the circuit breaker
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class JitteredRetry(Retry):
+    """urllib3 Retry sleeping a random time between 0 and the exponential backoff
+
+    the full jitter spreads the retries of the clients that failed together instead
+    of sending them back at the same moments. a Retry-After header of the answer
+    is still waited for as is.
+    """
+
+    def get_backoff_time(self) -> float:
+        return random.uniform(0, super().get_backoff_time())
+
+
+class CircuitState(Enum):
+    CLOSED = 1
+    OPEN = 2
+    HALF_OPEN = 3
+
+
+class CircuitBreaker:
+    """stops calling the open weather api while it keeps failing
+
+    after failure_threshold failures in a row the circuit opens and every call is
+    refused with exceptions.CircuitOpenError without reaching the api. once
+    reset_timeout seconds passed a single trial call is let through (half open),
+    its success closes the circuit and its failure opens it again. while half open
+    another trial is let through every reset_timeout seconds, in case the result of
+    the previous one never came.
+    """
+
+    def __init__(self,
+                 failure_threshold: int = 5,
+                 reset_timeout: float = 30,
+                 clock: typing.Callable[[], float] = time.monotonic) -> None:
+        if failure_threshold < 1:
+            raise ValueError('failure_threshold must be a positive number')
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        return self._state
+
+    def acquire(self) -> None:
+        """raise exceptions.CircuitOpenError when the call must not be made"""
+        if self._state == CircuitState.CLOSED:
+            return
+        with self._lock:
+            if self._state == CircuitState.CLOSED:
+                return
+            now = self._clock()
+            if now < self._retry_at:
+                raise CircuitOpenError(f'the circuit is open for {self._retry_at - now:.1f} '
+                                       f'more seconds')
+            self._state = CircuitState.HALF_OPEN
+            self._retry_at = now + self.reset_timeout
+
+    def record_success(self) -> None:
+        if self._state == CircuitState.CLOSED and not self._failures:
+            return
+        with self._lock:
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == CircuitState.HALF_OPEN or \
+                    self._failures >= self.failure_threshold:
+                self._state = CircuitState.OPEN
+                self._retry_at = self._clock() + self.reset_timeout
@@ -0,0 +1,73 @@
+import threading
+import typing
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """runs at most one call per key at a time
+
+    a caller asking for a key that is already in flight waits for the running call
+    and gets its result (or its exception) instead of running it again.
+    coalesced counts the callers that were served that way.
+    """
+
+    def __init__(self) -> None:
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: typing.Hashable, func: typing.Callable, *args) -> typing.Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """asyncio version of SingleFlight for coroutine functions
+
+    the call runs in its own task, so a waiter that is cancelled doesn't cancel it
+    for the others.
+    """
+
+    def __init__(self) -> None:
+        self.coalesced = 0
+        self._calls = {}
+
+    async def do(self, key: typing.Hashable, func: typing.Callable, *args) -> typing.Any:
+        # imported here, the thread clients don't need asyncio
+        import asyncio
+
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = self._calls[key] = asyncio.ensure_future(func(*args))
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
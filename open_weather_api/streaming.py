@@ -0,0 +1,130 @@
+import re
+import typing
+
+from open_weather_api import decoding
+from open_weather_api.fetch_weather import (
+    _build_payload,
+    ForecastType,
+    get_default_client,
+    OpenWeatherClient,
+    Units,
+)
+from open_weather_api.rate_limit import Priority
+from open_weather_api.records import CurrentForecast, DailyForecast
+
+_TOKENS = re.compile(rb'[{}\[\]"\\]')
+
+
+class _ArrayItemScanner:
+    """finds the objects of the array under key of the root json object in a stream
+
+    feed gets the stream chunk by chunk and returns the raw bytes of the objects that
+    ended in the chunk, so only one object and one chunk are held in memory.
+    """
+
+    def __init__(self, key: bytes) -> None:
+        self._key = key
+        self._depth = 0
+        self._offset = 0
+        self._in_string = False
+        self._escaped_at = -1
+        self._in_array = False
+        self._root_string = None
+        self._last_root_string = None
+        self._item = None
+
+    def feed(self, chunk: bytes) -> typing.List[bytes]:
+        items = []
+        item_from = 0 if self._item is not None else None
+        string_from = 0 if self._root_string is not None else None
+
+        for match in _TOKENS.finditer(chunk):
+            i = match.start()
+            if self._offset + i == self._escaped_at:
+                continue
+            char = chunk[i]
+
+            if self._in_string:
+                if char == 0x5c:  # backslash, the next byte is escaped
+                    self._escaped_at = self._offset + i + 1
+                elif char == 0x22:  # closing quote
+                    self._in_string = False
+                    if string_from is not None:
+                        self._root_string.extend(chunk[string_from:i])
+                        self._last_root_string = bytes(self._root_string)
+                        self._root_string = string_from = None
+                continue
+
+            if char == 0x22:
+                self._in_string = True
+                if self._depth == 1:
+                    self._root_string = bytearray()
+                    string_from = i + 1
+            elif char in (0x7b, 0x5b):  # { [
+                if self._in_array and self._depth == 2 and char == 0x7b:
+                    self._item = bytearray()
+                    item_from = i
+                elif self._depth == 1 and char == 0x5b and self._last_root_string == self._key:
+                    self._in_array = True
+                self._depth += 1
+            else:  # } ]
+                self._depth -= 1
+                if self._item is not None and self._depth == 2:
+                    self._item.extend(chunk[item_from:i + 1])
+                    items.append(bytes(self._item))
+                    self._item = item_from = None
+                elif self._in_array and self._depth == 1:
+                    self._in_array = False
+
+        if self._item is not None:
+            self._item.extend(chunk[item_from:])
+        if self._root_string is not None:
+            self._root_string.extend(chunk[string_from:])
+        self._offset += len(chunk)
+        return items
+
+
+def _iter_items(chunks: typing.Iterable[bytes], key: bytes) -> typing.Iterator[typing.Dict]:
+    scanner = _ArrayItemScanner(key)
+    for chunk in chunks:
+        for item in scanner.feed(chunk):
+            yield decoding.loads(item)
+
+
+def iter_group_forecasts(chunks: typing.Iterable[bytes]) -> typing.Iterator[CurrentForecast]:
+    """parse the cities of a group answer one by one while its chunks arrive"""
+    for forecast_city in _iter_items(chunks, b'list'):
+        yield CurrentForecast.from_json(forecast_city, precipitation=False)
+
+
+def iter_daily_forecasts(chunks: typing.Iterable[bytes]) -> typing.Iterator[DailyForecast]:
+    """parse the days of a forecast/daily answer one by one while its chunks arrive"""
+    for forecast_day in _iter_items(chunks, b'list'):
+        yield DailyForecast.from_json(forecast_day)
+
+
+_STREAM_PARSERS = {
+    ForecastType.DAILY_16: iter_daily_forecasts,
+    ForecastType.MULTIPLE: iter_group_forecasts,
+}
+
+
+def stream_city_forecast(city_id: typing.Union[int, typing.List],
+                         forecast_type: ForecastType = ForecastType.MULTIPLE,
+                         units: Units = Units.METRIC,
+                         client: typing.Optional[OpenWeatherClient] = None,
+                         chunk_size: int = 16 * 1024,
+                         priority: Priority = Priority.NORMAL) -> typing.Iterator:
+    """fetch the forecast and yield it a city (MULTIPLE) or a day (DAILY_16) at a time
+
+    the answer is parsed while it is downloaded so the memory used doesn't depend on
+    its size and the first records come before the download ends. the streamed
+    answers don't go through the cache of the client.
+    """
+    if forecast_type not in _STREAM_PARSERS:
+        raise ValueError('only ForecastType.DAILY_16 and ForecastType.MULTIPLE can be streamed')
+    client = client or get_default_client()
+    payload = _build_payload(city_id, forecast_type, units, client.api_key)
+
+    return _STREAM_PARSERS[forecast_type](
+        client._fetch_stream(forecast_type, payload, priority, chunk_size))
@@ -5,7 +5,17 @@ setup(
     maintainer_email="maintainer@example.com",
     name="open-weather-client",
     version="0.1",
-    packages=find_packages(),
+    packages=find_packages(exclude=("tests", "tests.*", "benchmarks", "benchmarks.*")),
     url="URL",
-    python_requires=">=3.6"
+    install_requires=["requests"],
+    extras_require={
+        "async": ["aiohttp"],
+        "columnar": ["numpy"],
+        "fast-json": ["orjson"],
+        "prometheus": ["prometheus_client"],
+    },
+    entry_points={
+        "console_scripts": ["open-weather=open_weather_api.cli:main"],
+    },
+    python_requires=">=3.7"
 )
@@ -0,0 +1,101 @@
+import json
+import threading
+import typing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def group_route(city_template: typing.Dict) -> typing.Callable:
+    """route for the group api answering for every asked id with a copy of city_template
+
+    the copies get the asked id and the name "city <id>"
+    """
+    def route(query: typing.Dict) -> typing.Tuple[int, typing.Dict]:
+        cities = [dict(city_template, id=int(c_id), name=f'city {c_id}')
+                  for c_id in query['id'].split(',')]
+        return 200, {'cnt': len(cities), 'list': cities}
+
+    return route
+
+
+class StubOpenWeatherServer:
+    """local http server answering like the open weather api
+
+    routes maps the api path (weather, group, forecast/daily) to a function
+    getting the query parameters and returning the status and the json body, and
+    optionally a dict of headers to add to the answer. a body that is an iterator of
+    bytes is sent chunk by chunk as it is produced, with chunked transfer encoding.
+    every request is recorded in requests as a tuple of the path and the query.
+    """
+
+    def __init__(self, routes: typing.Dict[str, typing.Callable]) -> None:
+        self.routes = routes
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f'http://{host}:{port}/'
+
+    def _make_handler(self) -> typing.Type[BaseHTTPRequestHandler]:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # the headers and the body are written apart, with nagle the body
+            # waits for the delayed ack of the client on kept alive connections
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                path = url.path.lstrip('/')
+                query = {key: value[0] for key, value in parse_qs(url.query).items()}
+                with stub._lock:
+                    stub.requests.append((path, query))
+
+                headers = {}
+                if path in stub.routes:
+                    status, body, *extra = stub.routes[path](query)
+                    headers = extra[0] if extra else headers
+                else:
+                    status, body = 404, {'cod': '404', 'message': 'Internal error'}
+
+                chunked = isinstance(body, typing.Iterator)
+                if not chunked:
+                    data = body if isinstance(body, bytes) else json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json; charset=utf-8')
+                    if chunked:
+                        self.send_header('Transfer-Encoding', 'chunked')
+                    else:
+                        self.send_header('Content-Length', str(len(data)))
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    if chunked:
+                        for data in body:
+                            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                        self.wfile.write(b'0\r\n\r\n')
+                    else:
+                        self.wfile.write(data)
+                except ConnectionError:
+                    # the client gave up on the request, like after a timeout
+                    self.close_connection = True
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
+
+    def __enter__(self) -> 'StubOpenWeatherServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
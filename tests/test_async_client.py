@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from open_weather_api.fetch_weather import ForecastType
+from tests.stub_server import group_route, StubOpenWeatherServer
+from tests.test_fetch_weather import (
+    OpenWeatherResponseDaily,
+    OpenWeatherResponseGroup,
+    OpenWeatherResponseRainy,
+)
+
+aiohttp = pytest.importorskip('aiohttp')
+
+from open_weather_api.async_client import AsyncOpenWeatherClient  # noqa: E402
+
+
+ROUTES = {
+    'weather': lambda query: (200, OpenWeatherResponseRainy().json()),
+    'forecast/daily': lambda query: (200, OpenWeatherResponseDaily().json()),
+    'group': lambda query: (200, OpenWeatherResponseGroup().json()),
+}
+
+
+def test_async_fetch_all_types() -> None:
+    async def fetch(base_url):
+        async with AsyncOpenWeatherClient(api_key='key', base_url=base_url) as client:
+            return await asyncio.gather(
+                client.get_current(2643743),
+                client.get_daily(2643743),
+                client.get_multiple([2643743, 4930956]),
+            )
+
+    with StubOpenWeatherServer(ROUTES) as server:
+        current, daily, multiple = asyncio.run(fetch(server.base_url))
+
+    assert current['city_name'] == 'London'
+    assert current['rain'] == 0.47
+    assert len(daily['forecasts']) == 7
+    assert set(multiple) == {'London', 'Boston'}
+    assert ('group', {'id': '2643743,4930956', 'appid': 'key', 'units': 'standard'}) \
+        in server.requests
+
+
+def test_async_bounded_concurrency() -> None:
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def slow_weather(query):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return 200, OpenWeatherResponseRainy().json()
+
+    async def fetch(base_url):
+        async with AsyncOpenWeatherClient(base_url=base_url, max_concurrency=3) as client:
+            return await asyncio.gather(*(client.get_current(2643743) for _ in range(10)))
+
+    with StubOpenWeatherServer({'weather': slow_weather}) as server:
+        results = asyncio.run(fetch(server.base_url))
+
+    assert len(results) == 10
+    assert in_flight[1] <= 3
+
+
+def test_async_timeout() -> None:
+    def slow_weather(query):
+        time.sleep(0.5)
+        return 200, OpenWeatherResponseRainy().json()
+
+    async def fetch(base_url):
+        async with AsyncOpenWeatherClient(base_url=base_url, timeout=0.1) as client:
+            return await client.get_city_forecast(2643743, ForecastType.CURRENT)
+
+    with StubOpenWeatherServer({'weather': slow_weather}) as server:
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(fetch(server.base_url))
+
+
+def test_async_multiple_forecasts_chunked() -> None:
+    route = group_route(OpenWeatherResponseGroup().json()['list'][0])
+
+    def failing_route(query):
+        if '3' in query['id'].split(','):
+            return 500, {'cod': 500, 'message': 'Internal error'}
+        return route(query)
+
+    async def fetch(base_url):
+        async with AsyncOpenWeatherClient(base_url=base_url) as client:
+            return await client.get_multiple_forecasts(range(1, 8), chunk_size=2)
+
+    with StubOpenWeatherServer({'group': failing_route}) as server:
+        result = asyncio.run(fetch(server.base_url))
+
+    assert list(result.forecasts) == ['city 1', 'city 2', 'city 5', 'city 6', 'city 7']
+    assert list(result.failures) == [(3, 4)]
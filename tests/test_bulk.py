@@ -0,0 +1,53 @@
+from concurrent.futures import ProcessPoolExecutor
+import typing
+
+from open_weather_api.bulk import fetch_daily_forecasts
+from open_weather_api.exceptions import NotFound
+from open_weather_api.fetch_weather import _parse_forecast_daily, OpenWeatherClient
+from open_weather_api.records import CityForecasts
+from tests.stub_server import StubOpenWeatherServer
+from tests.test_fetch_weather import OpenWeatherResponseDaily
+
+
+def daily_route(query: typing.Dict) -> typing.Tuple[int, typing.Dict]:
+    if query['id'] == '4':
+        return 404, {'cod': '404', 'message': 'city not found'}
+    if query['id'] == '5':
+        return 200, {'cod': '401', 'message': 'Invalid API key'}
+    payload = OpenWeatherResponseDaily().json()
+    payload['city'] = dict(payload['city'], id=int(query['id']), name=f"city {query['id']}")
+    return 200, payload
+
+
+def test_daily_forecasts_parsed_in_processes() -> None:
+    with StubOpenWeatherServer({'forecast/daily': daily_route}) as server:
+        with OpenWeatherClient(base_url=server.base_url) as client:
+            result = fetch_daily_forecasts([3, 1, 4, 2, 5, 1], client=client, processes=2)
+
+    assert list(result.forecasts) == [3, 1, 2]
+    assert all(isinstance(forecast, CityForecasts) for forecast in result.forecasts.values())
+    assert [forecast.city_name for forecast in result.forecasts.values()] == \
+        ['city 3', 'city 1', 'city 2']
+    assert result.forecasts[3].to_dict() == \
+        _parse_forecast_daily(daily_route({'id': '3'})[1]).to_dict()
+    assert list(result.failures) == [(4,), (5,)]
+    assert isinstance(result.failures[(4,)], NotFound)
+    assert result.failures[(5,)].status_code == 401
+    assert len(server.requests) == 5
+
+
+def test_daily_forecasts_with_given_executor() -> None:
+    with StubOpenWeatherServer({'forecast/daily': daily_route}) as server:
+        with OpenWeatherClient(base_url=server.base_url) as client, \
+                ProcessPoolExecutor(max_workers=1) as executor:
+            first = fetch_daily_forecasts([1], client=client, executor=executor)
+            second = fetch_daily_forecasts([2], client=client, executor=executor)
+
+    assert list(first.forecasts) == [1]
+    assert list(second.forecasts) == [2]
+
+
+def test_daily_forecasts_nothing_to_fetch() -> None:
+    result = fetch_daily_forecasts([], client=OpenWeatherClient())
+    assert result.forecasts == {}
+    assert result.failures == {}
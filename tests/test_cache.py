@@ -0,0 +1,159 @@
+import multiprocessing
+
+from pytest_mock import MockerFixture
+
+from open_weather_api.cache import SQLiteCache, TTLCache
+from open_weather_api.fetch_weather import ForecastType, OpenWeatherClient, Units
+from tests.stub_server import group_route, StubOpenWeatherServer
+from tests.test_fetch_weather import (
+    OpenWeatherResponseDaily,
+    OpenWeatherResponseGroup,
+    OpenWeatherResponseRainy,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_expiry() -> None:
+    clock = FakeClock()
+    cache = TTLCache(ttls={ForecastType.CURRENT: 60}, clock=clock)
+    cache.set('key', 'value', cache.ttl_for(ForecastType.CURRENT))
+
+    clock.now += 59
+    assert cache.get('key') == 'value'
+    clock.now += 1
+    assert cache.get('key') is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_cache_lru_eviction() -> None:
+    cache = TTLCache(max_size=2)
+    cache.set('a', 1, 60)
+    cache.set('b', 2, 60)
+    assert cache.get('a') == 1
+    cache.set('c', 3, 60)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats.evictions == 1
+    assert len(cache) == 2
+
+
+def test_sqlite_cache_expiry_and_compact(tmp_path) -> None:
+    clock = FakeClock()
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), clock=clock)
+    cache.set('a', {'temp': 1}, 60)
+    cache.set('b', {'temp': 2}, 120)
+
+    assert cache.get('a') == {'temp': 1}
+    clock.now += 60
+    assert cache.get('a') is None
+    assert cache.get_entry('a').value == {'temp': 1}
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+    assert cache.compact() == 1
+    assert len(cache) == 1
+    assert cache.get('b') == {'temp': 2}
+
+
+def _write_entry(path: str, key: str) -> None:
+    SQLiteCache(path).set(key, {'written_by': 'child'}, 60)
+
+
+def test_sqlite_cache_shared_between_processes(tmp_path) -> None:
+    path = str(tmp_path / 'cache.db')
+    cache = SQLiteCache(path)
+    processes = [multiprocessing.Process(target=_write_entry, args=(path, f'key {i}'))
+                 for i in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert [cache.get(f'key {i}') for i in range(4)] == [{'written_by': 'child'}] * 4
+
+
+def test_client_cache_hit_skips_fetch_and_parse(mocker: MockerFixture) -> None:
+    requests_mock = mocker.patch('requests.Session.get')
+    requests_mock.return_value = OpenWeatherResponseRainy()
+    parser_mock = mocker.Mock(return_value={'city_name': 'London'})
+    mocker.patch.dict('open_weather_api.fetch_weather._API_PARSER',
+                      {ForecastType.CURRENT: {'api': 'weather', 'parser': parser_mock}})
+    client = OpenWeatherClient(cache=TTLCache())
+
+    first = client.get_city_forecast(2643743, ForecastType.CURRENT, Units.STANDARD)
+    second = client.get_city_forecast(2643743, ForecastType.CURRENT, Units.STANDARD)
+
+    assert first is second
+    assert requests_mock.call_count == 1
+    assert parser_mock.call_count == 1
+
+
+def test_client_cache_key_and_opt_out(mocker: MockerFixture) -> None:
+    requests_mock = mocker.patch('requests.Session.get')
+    requests_mock.return_value = OpenWeatherResponseDaily()
+    client = OpenWeatherClient(cache=TTLCache())
+
+    client.get_city_forecast(2643743, ForecastType.DAILY_16, Units.METRIC)
+    # every units is served from the same entry
+    client.get_city_forecast(2643743, ForecastType.DAILY_16, Units.IMPERIAL)
+    client.get_city_forecast(2643743, ForecastType.DAILY_16, Units.METRIC)
+    client.get_city_forecast(2643743, ForecastType.DAILY_16, Units.METRIC, use_cache=False)
+
+    assert requests_mock.call_count == 2
+    assert client.cache.stats.hits == 2
+
+
+def test_client_sqlite_cache(mocker: MockerFixture, tmp_path) -> None:
+    requests_mock = mocker.patch('requests.Session.get')
+    requests_mock.return_value = OpenWeatherResponseRainy()
+    path = str(tmp_path / 'cache.db')
+
+    first = OpenWeatherClient(cache=SQLiteCache(path)).get_city_forecast(2643743)
+    second = OpenWeatherClient(cache=SQLiteCache(path)).get_city_forecast(2643743)
+
+    assert first == second
+    assert requests_mock.call_count == 1
+
+
+def test_client_group_served_partially_from_cache() -> None:
+    city_template = OpenWeatherResponseGroup().json()['list'][0]
+    routes = {
+        'group': group_route(dict(city_template, rain={'3h': 0.5})),
+        'weather': lambda query: (200, dict(city_template, rain={'1h': 0.7})),
+    }
+    with StubOpenWeatherServer(routes) as server:
+        client = OpenWeatherClient(base_url=server.base_url, cache=TTLCache())
+        client.get_city_forecast([1, 2, 3], ForecastType.MULTIPLE)
+        result = client.get_city_forecast([4, 2, 5, 1], ForecastType.MULTIPLE)
+        # the group answer doesn't tell the rain of the last hour
+        assert client.get_cached_forecast(3, ForecastType.CURRENT) is None
+        current = client.get_city_forecast(3, ForecastType.CURRENT)
+        cached = client.get_city_forecast(3, ForecastType.CURRENT)
+
+    assert [(path, query['id']) for path, query in server.requests] == \
+        [('group', '1,2,3'), ('group', '4,5'), ('weather', '3')]
+    assert list(result) == ['city 4', 'city 2', 'city 5', 'city 1']
+    assert result['city 2'] == dict(result['city 4'], city_name='city 2')
+    assert 'rain' not in result['city 2']
+    assert current['rain'] == cached['rain'] == 0.7
+
+
+def test_client_group_uses_current_entries(mocker: MockerFixture) -> None:
+    requests_mock = mocker.patch('requests.Session.get')
+    requests_mock.return_value = OpenWeatherResponseRainy()
+    client = OpenWeatherClient(cache=TTLCache())
+
+    current = client.get_city_forecast(2643743, ForecastType.CURRENT)
+    group = client.get_city_forecast([2643743], ForecastType.MULTIPLE)
+
+    assert requests_mock.call_count == 1
+    assert group == {'London': {key: value for key, value in current.items()
+                                if key not in ('rain', 'snow')}}
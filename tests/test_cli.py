@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+import typing
+
+import pytest
+
+from open_weather_api.cli import main, read_city_ids
+from tests.stub_server import group_route, StubOpenWeatherServer
+from tests.test_fetch_weather import in_kelvin, OpenWeatherResponseDaily, OpenWeatherResponseGroup
+
+GROUP_ROUTE = group_route(in_kelvin(OpenWeatherResponseGroup().json()['list'][0]))
+
+
+def daily_route(query: typing.Dict) -> typing.Tuple[int, typing.Dict]:
+    payload = in_kelvin(OpenWeatherResponseDaily().json())
+    payload['city']['name'] = f"city {query['id']}"
+    return 200, payload
+
+
+def test_read_city_ids() -> None:
+    assert read_city_ids(['# hot cities\n', '3, 1 2\n', '\n', '1\n']) == [3, 1, 2]
+    with pytest.raises(ValueError, match='London'):
+        read_city_ids(['1 London'])
+
+
+def test_current_ndjson_in_chunks(tmp_path, capsys) -> None:
+    path = tmp_path / 'cities.txt'
+    path.write_text('# cities\n' + '\n'.join(str(c_id) for c_id in range(1, 6)) + '\n3\n')
+    with StubOpenWeatherServer({'group': GROUP_ROUTE}) as server:
+        code = main([str(path), '--base-url', server.base_url, '--chunk-size', '2',
+                     '--units', 'imperial'])
+
+    out = capsys.readouterr().out
+    lines = [json.loads(line) for line in out.splitlines()]
+    assert code == 0
+    assert sorted(line['city_id'] for line in lines) == [1, 2, 3, 4, 5]
+    assert lines[0]['current_temp'] == 50.67
+    assert lines[0]['forecast_time'] == '2020-10-12T18:11:16+00:00'
+    assert sorted(query['id'] for _, query in server.requests) == ['1,2', '3,4', '5']
+    assert {query['units'] for _, query in server.requests} == {'standard'}
+
+
+def test_daily_csv_from_stdin(monkeypatch, capsys) -> None:
+    monkeypatch.setattr('sys.stdin', io.StringIO('7 8\n'))
+    with StubOpenWeatherServer({'forecast/daily': daily_route}) as server:
+        code = main(['--type', 'daily', '--format', 'csv', '--base-url', server.base_url,
+                     '--concurrency', '2'])
+
+    rows = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+    assert code == 0
+    assert len(rows) == 14
+    assert {(row['city_id'], row['city_name']) for row in rows} == \
+        {('7', 'city 7'), ('8', 'city 8')}
+    first = next(row for row in rows if row['city_id'] == '7')
+    assert (first['day_temp'], first['forecast_time']) == ('13.65', '2020-10-12T11:00:00+00:00')
+    assert len(server.requests) == 2
+
+
+def test_failed_batch_reported(tmp_path, capsys) -> None:
+    def route(query):
+        if '4' in query['id'].split(','):
+            return 503, {'cod': 503, 'message': 'unavailable'}
+        return GROUP_ROUTE(query)
+
+    path = tmp_path / 'cities.txt'
+    path.write_text('1 2 3 4')
+    with StubOpenWeatherServer({'group': route}) as server:
+        code = main([str(path), '--base-url', server.base_url, '--chunk-size', '2', '--stats'])
+
+    captured = capsys.readouterr()
+    assert code == 1
+    assert [json.loads(line)['city_id'] for line in captured.out.splitlines()] == [1, 2]
+    assert 'cities 3,4 failed: UpstreamError: unavailable' in captured.err
+    assert 'cities: 2 fetched, 2 failed in 2 batches' in captured.err
+
+
+def test_unknown_cities_reported(tmp_path, capsys) -> None:
+    def route(query):
+        return GROUP_ROUTE(dict(query, id=','.join(c_id for c_id in query['id'].split(',')
+                                                   if c_id != '2')))
+
+    path = tmp_path / 'cities.txt'
+    path.write_text('1 2 3')
+    with StubOpenWeatherServer({'group': route}) as server:
+        code = main([str(path), '--base-url', server.base_url, '--stats'])
+
+    captured = capsys.readouterr()
+    assert code == 1
+    assert [json.loads(line)['city_id'] for line in captured.out.splitlines()] == [1, 3]
+    assert 'cities 2 failed: NotFound: city not found' in captured.err
+    assert 'cities: 2 fetched, 1 failed in 1 batches' in captured.err
+
+
+def test_cache_file_between_runs(tmp_path, capsys) -> None:
+    path = tmp_path / 'cities.txt'
+    path.write_text('1 2')
+    args = [str(path), '--cache', str(tmp_path / 'cache.db'), '--stats']
+    with StubOpenWeatherServer({'group': GROUP_ROUTE}) as server:
+        main(args + ['--base-url', server.base_url])
+        first = capsys.readouterr()
+        main(args + ['--base-url', server.base_url])
+        second = capsys.readouterr()
+
+    assert len(server.requests) == 1
+    assert second.out == first.out
+    assert 'cache: 2 hits, 0 misses' in second.err
+
+
+def test_bad_input(tmp_path) -> None:
+    path = tmp_path / 'cities.txt'
+    path.write_text('1 two')
+    with pytest.raises(SystemExit) as error:
+        main([str(path)])
+    assert error.value.code == 2
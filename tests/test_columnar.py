@@ -0,0 +1,74 @@
+import pytest
+
+from open_weather_api.fetch_weather import _parse_forecast_daily, OpenWeatherClient
+from tests.stub_server import group_route, StubOpenWeatherServer
+from tests.test_fetch_weather import OpenWeatherResponseDaily, OpenWeatherResponseGroup
+
+np = pytest.importorskip('numpy')
+
+from open_weather_api.columnar import (  # noqa: E402
+    DailyColumns,
+    fetch_daily_columns,
+    fetch_group_columns,
+    GroupColumns,
+)
+
+
+def _daily_payload(city_id: int) -> dict:
+    payload = OpenWeatherResponseDaily().json()
+    payload['city']['id'] = city_id
+    payload['city']['name'] = f'city {city_id}'
+    return payload
+
+
+def test_daily_columns_match_records() -> None:
+    payload = OpenWeatherResponseDaily().json()
+    columns = DailyColumns([payload])
+    forecast = _parse_forecast_daily(payload)
+
+    assert len(columns) == 7
+    assert columns['dt'].dtype == np.int64
+    assert columns['day_temp'].tolist() == [day['day_temp'] for day in forecast['forecasts']]
+    assert columns['snow'].tolist() == [day['snow'] for day in forecast['forecasts']]
+    assert columns['sunrise'][0] == forecast.forecasts[0].sunrise
+    assert columns.datetimes('sunset').dtype == np.dtype('datetime64[s]')
+    assert columns.datetimes().astype(object).tolist() == \
+        [day['forecast_time'].replace(tzinfo=None) for day in forecast['forecasts']]
+
+
+def test_daily_columns_aggregate_per_city() -> None:
+    first = _daily_payload(1)
+    second = _daily_payload(2)
+    second['list'] = second['list'][:3]
+    columns = DailyColumns([first, second])
+
+    assert columns.offsets.tolist() == [0, 7, 10]
+    assert columns.city_index.tolist() == [0] * 7 + [1] * 3
+    assert columns.per_city('max_temp', np.maximum).tolist() == [14.91, 14.91]
+    assert columns.per_city('rain').tolist() == pytest.approx([6.9, 6.65])
+    assert columns.mean_per_city('precipitation_probability')[1] == pytest.approx(2.53 / 3)
+    assert DailyColumns([first, first]).matrix('day_temp').shape == (2, 7)
+
+
+def test_group_columns() -> None:
+    columns = GroupColumns([OpenWeatherResponseGroup().json()])
+
+    assert columns.city_names == ['London', 'Boston']
+    assert columns.city_ids.tolist() == [2643743, 4930956]
+    assert columns['current_temp'].tolist() == [10.37, 12.15]
+    assert columns['sunset'].tolist() == [1602522824, 1602540413]
+
+
+def test_fetch_columns() -> None:
+    routes = {
+        'group': group_route(OpenWeatherResponseGroup().json()['list'][0]),
+        'forecast/daily': lambda query: (200, _daily_payload(int(query['id']))),
+    }
+    with StubOpenWeatherServer(routes) as server:
+        client = OpenWeatherClient(base_url=server.base_url)
+        daily = fetch_daily_columns([3, 1, 2], client=client)
+        group = fetch_group_columns(range(1, 31), client=client)
+
+    assert daily.city_ids.tolist() == [3, 1, 2]
+    assert len(daily) == 21
+    assert group.city_ids.tolist() == list(range(1, 31))
@@ -0,0 +1,130 @@
+import asyncio
+import pickle
+
+import pytest
+
+from open_weather_api.cache import TTLCache
+from open_weather_api.exceptions import (
+    ApiError,
+    NotFound,
+    RateLimited,
+    Unauthorized,
+    UpstreamError,
+)
+from open_weather_api.fetch_weather import ForecastType, OpenWeatherClient
+from tests.stub_server import group_route, StubOpenWeatherServer
+from tests.test_cache import FakeClock
+from tests.test_fetch_weather import OpenWeatherResponseGroup
+
+NOT_FOUND = (404, {'cod': '404', 'message': 'city not found'})
+
+
+@pytest.mark.parametrize('status, exception', [
+    (401, Unauthorized),
+    (404, NotFound),
+    (429, RateLimited),
+    (503, UpstreamError),
+    (400, UpstreamError),
+])
+def test_error_status_raises(status: int, exception: type) -> None:
+    answer = (status, {'cod': status, 'message': 'some error'})
+    with StubOpenWeatherServer({'weather': lambda query: answer}) as server:
+        with OpenWeatherClient(base_url=server.base_url, max_retries=0) as client:
+            with pytest.raises(exception) as error:
+                client.get_city_forecast(2643743, ForecastType.CURRENT)
+
+    assert error.value.status_code == status
+    assert str(error.value) == 'some error'
+
+
+def test_error_cod_of_ok_answer_raises() -> None:
+    with StubOpenWeatherServer({'weather': lambda query: (200, NOT_FOUND[1])}) as server:
+        with OpenWeatherClient(base_url=server.base_url) as client:
+            with pytest.raises(NotFound, match='city not found'):
+                client.get_city_forecast(2643743, ForecastType.CURRENT)
+
+
+def test_error_answer_not_json() -> None:
+    with StubOpenWeatherServer({'weather': lambda query: (502, b'<html>bad gateway</html>')}) \
+            as server:
+        with OpenWeatherClient(base_url=server.base_url, max_retries=0) as client:
+            with pytest.raises(UpstreamError, match='bad gateway'):
+                client.get_city_forecast(2643743, ForecastType.CURRENT)
+
+
+def test_api_error_picklable() -> None:
+    error = pickle.loads(pickle.dumps(NotFound('city not found', 404)))
+    assert isinstance(error, ApiError)
+    assert error.status_code == 404
+    assert str(error) == 'city not found'
+
+
+def test_not_found_cached() -> None:
+    clock = FakeClock()
+    with StubOpenWeatherServer({'forecast/daily': lambda query: NOT_FOUND}) as server:
+        with OpenWeatherClient(base_url=server.base_url, cache=TTLCache(clock=clock),
+                               not_found_ttl=30) as client:
+            for _ in range(3):
+                with pytest.raises(NotFound):
+                    client.get_city_forecast(1, ForecastType.DAILY_16)
+            assert client.get_cached_forecast(1, ForecastType.DAILY_16) is None
+            clock.now += 30
+            with pytest.raises(NotFound):
+                client.get_city_forecast(1, ForecastType.DAILY_16)
+
+    assert len(server.requests) == 2
+
+
+def test_not_found_city_left_out_of_groups() -> None:
+    route = group_route(OpenWeatherResponseGroup().json()['list'][0])
+    with StubOpenWeatherServer({'weather': lambda query: NOT_FOUND, 'group': route}) as server:
+        with OpenWeatherClient(base_url=server.base_url, cache=TTLCache()) as client:
+            with pytest.raises(NotFound):
+                client.get_city_forecast(1, ForecastType.CURRENT)
+            result = client.get_city_forecast([1, 2, 3], ForecastType.MULTIPLE)
+
+    assert list(result) == ['city 2', 'city 3']
+    assert server.requests[-1] == ('group', {'id': '2,3', 'units': 'standard'})
+
+
+def test_not_found_city_left_out_of_group_answer_cached() -> None:
+    template = OpenWeatherResponseGroup().json()['list'][0]
+    known = group_route(template)
+
+    def route(query):
+        query = dict(query, id=','.join(c_id for c_id in query['id'].split(',')
+                                        if c_id != '999'))
+        return known(query)
+
+    with StubOpenWeatherServer({'group': route}) as server:
+        with OpenWeatherClient(base_url=server.base_url, cache=TTLCache()) as client:
+            for _ in range(3):
+                result = client.get_city_forecast([1, 2, 999], ForecastType.MULTIPLE)
+                by_id = client.get_forecasts_by_id([1, 2, 999])
+
+    assert list(result) == ['city 1', 'city 2']
+    assert list(by_id.forecasts) == [1, 2]
+    assert server.requests == [('group', {'id': '1,2,999', 'units': 'standard'})]
+
+
+def test_not_found_group_cached() -> None:
+    with StubOpenWeatherServer({'group': lambda query: NOT_FOUND}) as server:
+        with OpenWeatherClient(base_url=server.base_url, cache=TTLCache()) as client:
+            with pytest.raises(NotFound):
+                client.get_city_forecast([998, 999], ForecastType.MULTIPLE)
+            assert client.get_city_forecast([998, 999], ForecastType.MULTIPLE) == {}
+
+    assert len(server.requests) == 1
+
+
+def test_async_error_status_raises() -> None:
+    pytest.importorskip('aiohttp')
+    from open_weather_api.async_client import AsyncOpenWeatherClient
+
+    async def fetch(base_url):
+        async with AsyncOpenWeatherClient(base_url=base_url) as client:
+            await client.get_current(1)
+
+    with StubOpenWeatherServer({'weather': lambda query: NOT_FOUND}) as server:
+        with pytest.raises(NotFound):
+            asyncio.run(fetch(server.base_url))
@@ -1,15 +1,57 @@
 import datetime
+import json
+import typing
 
 import pytest
 from pytest_mock import MockerFixture
 
+from tests.stub_server import group_route, StubOpenWeatherServer
+
+from open_weather_api.cache import TTLCache
 from open_weather_api.fetch_weather import (
     get_city_forecast,
+    get_default_client,
     ForecastType,
+    OpenWeatherClient,
+    Units,
 )
 
 
-class OpenWeatherResponseRainy:
+class OpenWeatherResponse:
+    status_code = 200
+
+    @property
+    def content(self):
+        return json.dumps(self.json()).encode()
+
+
+def in_kelvin(data: typing.Any) -> typing.Any:
+    """the json of a metric answer with the temperatures in kelvin, like the answer
+    in the standard units the clients fetch"""
+    if isinstance(data, list):
+        return [in_kelvin(value) for value in data]
+    if not isinstance(data, dict):
+        return data
+    converted = {}
+    for key, value in data.items():
+        if key in ('temp', 'temp_min', 'temp_max', 'feels_like'):
+            if isinstance(value, dict):
+                value = {part: round(temp + 273.15, 2) for part, temp in value.items()}
+            else:
+                value = round(value + 273.15, 2)
+        converted[key] = in_kelvin(value)
+    return converted
+
+
+class InStandardUnits(OpenWeatherResponse):
+    def __init__(self, response: OpenWeatherResponse) -> None:
+        self._response = response
+
+    def json(self):
+        return in_kelvin(self._response.json())
+
+
+class OpenWeatherResponseRainy(OpenWeatherResponse):
     def json(self):
         return {
             'coord': {
@@ -59,7 +101,7 @@ class OpenWeatherResponseRainy:
         }
 
 
-class OpenWeatherResponseSnow:
+class OpenWeatherResponseSnow(OpenWeatherResponse):
     def json(self):
         return {
             'coord': {
@@ -109,7 +151,7 @@ class OpenWeatherResponseSnow:
         }
 
 
-class OpenWeatherResponseDaily:
+class OpenWeatherResponseDaily(OpenWeatherResponse):
     def json(self):
         return {
             'city': {
@@ -367,7 +409,7 @@ class OpenWeatherResponseDaily:
         }
 
 
-class OpenWeatherResponseGroup:
+class OpenWeatherResponseGroup(OpenWeatherResponse):
     def json(self):
         return {
             'cnt': 2,
@@ -455,8 +497,8 @@ class OpenWeatherResponseGroup:
 
 
 def test_fetch_forecast_current_rainy(mocker: MockerFixture) -> None:
-    requests_mock = mocker.patch('requests.get')
-    requests_mock.return_value = OpenWeatherResponseRainy()
+    requests_mock = mocker.patch('requests.Session.get')
+    requests_mock.return_value = InStandardUnits(OpenWeatherResponseRainy())
     expected_result = {
         'main': 'Rain',
         'description': 'light rain',
@@ -483,8 +525,8 @@ def test_fetch_forecast_current_rainy(mocker: MockerFixture) -> None:
 
 
 def test_fetch_forecast_current_snowy(mocker: MockerFixture) -> None:
-    requests_mock = mocker.patch('requests.get')
-    requests_mock.return_value = OpenWeatherResponseSnow()
+    requests_mock = mocker.patch('requests.Session.get')
+    requests_mock.return_value = InStandardUnits(OpenWeatherResponseSnow())
     expected_result = {
         'main': 'Rain',
         'description': 'light rain',
@@ -511,8 +553,8 @@ def test_fetch_forecast_current_snowy(mocker: MockerFixture) -> None:
 
 
 def test_fetch_forecast_daily(mocker: MockerFixture) -> None:
-    requests_mock = mocker.patch('requests.get')
-    requests_mock.return_value = OpenWeatherResponseDaily()
+    requests_mock = mocker.patch('requests.Session.get')
+    requests_mock.return_value = InStandardUnits(OpenWeatherResponseDaily())
     expected_result = {
         'city_name': 'London',
         'country': 'GB',
@@ -692,8 +734,8 @@ def test_fetch_forecast_daily(mocker: MockerFixture) -> None:
 
 
 def test_fetch_forecast_group(mocker: MockerFixture) -> None:
-    requests_mock = mocker.patch('requests.get')
-    requests_mock.return_value = OpenWeatherResponseGroup()
+    requests_mock = mocker.patch('requests.Session.get')
+    requests_mock.return_value = InStandardUnits(OpenWeatherResponseGroup())
     expected_result = {
         'London': {
             'main': 'Rain',
@@ -744,3 +786,79 @@ def test_fetch_forecast_group_fail_multiple_no_list() -> None:
 def test_fetch_forecast_group_fail_single_list() -> None:
     with pytest.raises(ValueError):
         get_city_forecast([2643743], ForecastType.CURRENT)
+
+
+def test_default_client_is_reused() -> None:
+    assert get_default_client() is get_default_client()
+
+
+def test_client_pooled_adapter() -> None:
+    client = OpenWeatherClient(pool_size=25, max_retries=5)
+    adapter = client._session.get_adapter('https://api.openweathermap.org/')
+    assert adapter._pool_maxsize == 25
+    assert adapter.max_retries.total == 5
+    client.close()
+
+
+def test_client_request_params(mocker: MockerFixture) -> None:
+    requests_mock = mocker.patch('requests.Session.get')
+    requests_mock.return_value = OpenWeatherResponseRainy()
+    with OpenWeatherClient(api_key='key', base_url='http://localhost/') as client:
+        client.get_city_forecast(2643743, ForecastType.CURRENT, Units.IMPERIAL)
+    requests_mock.assert_called_once_with('http://localhost/weather',
+                                          params={'id': 2643743, 'appid': 'key',
+                                                  'units': 'standard'},
+                                          timeout=(3.05, 10), stream=False)
+
+
+def test_client_converts_units_locally(mocker: MockerFixture) -> None:
+    requests_mock = mocker.patch('requests.Session.get')
+    requests_mock.side_effect = lambda url, **kwargs: InStandardUnits(
+        OpenWeatherResponseDaily() if 'daily' in url else OpenWeatherResponseRainy())
+    client = OpenWeatherClient(cache=TTLCache())
+
+    metric = client.get_city_forecast(2643743, ForecastType.CURRENT, Units.METRIC)
+    imperial = client.get_city_forecast(2643743, ForecastType.CURRENT, Units.IMPERIAL)
+    standard = client.get_city_forecast(2643743, ForecastType.CURRENT, Units.STANDARD)
+    group = client.get_city_forecast([2643743], ForecastType.MULTIPLE, Units.IMPERIAL)
+    daily = client.get_city_forecast(2643743, ForecastType.DAILY_16, Units.IMPERIAL)
+    cached = client.get_cached_forecast(2643743, ForecastType.DAILY_16, Units.METRIC)
+
+    assert (metric['current_temp'], metric['max_temp'], metric['wind_speed']) == (11.14, 12, 2.6)
+    assert (imperial['current_temp'], imperial['max_temp'], imperial['wind_speed']) == \
+        (52.05, 53.6, 5.82)
+    assert (standard['current_temp'], standard['wind_speed']) == (284.29, 2.6)
+    assert group['London']['current_temp'] == 52.05
+    assert imperial['humidity'] == metric['humidity'] and imperial['rain'] == metric['rain']
+    assert (daily['forecasts'][0]['day_temp'], daily['forecasts'][0]['wind_speed']) == \
+        (56.57, 9.22)
+    assert cached['forecasts'][0]['day_temp'] == 13.65
+    assert [call.kwargs['params']['units'] for call in requests_mock.call_args_list] == \
+        ['standard', 'standard']
+
+
+def test_client_multiple_forecasts_chunked() -> None:
+    route = group_route(OpenWeatherResponseGroup().json()['list'][0])
+    with StubOpenWeatherServer({'group': route}) as server:
+        with OpenWeatherClient(base_url=server.base_url) as client:
+            result = client.get_multiple_forecasts(range(1, 46), chunk_size=20)
+
+    assert result.failures == {}
+    assert list(result.forecasts) == [f'city {c_id}' for c_id in range(1, 46)]
+    assert sorted(len(query['id'].split(',')) for _, query in server.requests) == [5, 20, 20]
+
+
+def test_client_multiple_forecasts_chunk_failure() -> None:
+    route = group_route(OpenWeatherResponseGroup().json()['list'][0])
+
+    def failing_route(query):
+        if '3' in query['id'].split(','):
+            return 500, {'cod': 500, 'message': 'Internal error'}
+        return route(query)
+
+    with StubOpenWeatherServer({'group': failing_route}) as server:
+        with OpenWeatherClient(base_url=server.base_url, max_retries=0) as client:
+            result = client.get_multiple_forecasts([1, 2, 3, 4, 5, 1], chunk_size=2)
+
+    assert list(result.forecasts) == ['city 1', 'city 2', 'city 5']
+    assert list(result.failures) == [(3, 4)]
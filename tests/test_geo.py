@@ -0,0 +1,190 @@
+import gzip
+import json
+import random
+
+import pytest
+
+from open_weather_api.cache import TTLCache
+from open_weather_api.exceptions import UnknownCity
+from open_weather_api.fetch_weather import ForecastType, OpenWeatherClient
+from open_weather_api.geo import _in_bbox, bbox_center, City, CityIndex, distance_km
+from tests.stub_server import group_route, StubOpenWeatherServer
+from tests.test_fetch_weather import OpenWeatherResponseGroup, OpenWeatherResponseRainy
+
+CITIES = [
+    City(2643743, 'London', 'GB', 51.5085, -0.1257),
+    City(6058560, 'London', 'CA', 42.9834, -81.233),
+    City(4930956, 'Boston', 'US', 42.3584, -71.0598),
+    City(2657896, 'Zürich', 'CH', 47.3667, 8.55),
+    City(293397, 'Tel Aviv', 'IL', 32.0809, 34.7806),
+    City(2172517, 'Canberra', 'AU', -35.2835, 149.1281),
+]
+
+
+def random_cities(count: int) -> list:
+    generator = random.Random(7)
+    return [City(c_id, f'city {c_id}', 'XX', generator.uniform(-90, 90),
+                 generator.uniform(-180, 180)) for c_id in range(1, count + 1)]
+
+
+def test_nearest_city() -> None:
+    index = CityIndex.from_cities(CITIES)
+
+    assert len(index) == 6
+    assert index.nearest(51.3, 0.4) == [CITIES[0]]
+    assert index.nearest(-33.9, 151.2)[0].name == 'Canberra'
+    assert [city.name for city in index.nearest(42, -75, 3)] == ['Boston', 'London', 'London']
+    assert [city.id for city in index.nearest(0, 0, 10)] == \
+        [city.id for city in sorted(CITIES, key=lambda city: distance_km(0, 0, city.lat,
+                                                                         city.lon))]
+
+
+def test_nearest_matches_brute_force() -> None:
+    cities = random_cities(2000)
+    index = CityIndex.from_cities(cities)
+    generator = random.Random(3)
+    # the poles and the antimeridian included
+    points = [(89.9, 0), (-89.9, 0), (0, 179.99), (0, -179.99)] + \
+        [(generator.uniform(-90, 90), generator.uniform(-180, 180)) for _ in range(50)]
+
+    for lat, lon in points:
+        expected = sorted(cities, key=lambda city: distance_km(lat, lon, city.lat, city.lon))
+        assert index.nearest(lat, lon, 4) == expected[:4]
+
+
+def test_within_radius_matches_brute_force() -> None:
+    cities = random_cities(2000)
+    index = CityIndex.from_cities(cities)
+    generator = random.Random(5)
+    points = [(89.9, 0), (0, 179.99)] + \
+        [(generator.uniform(-90, 90), generator.uniform(-180, 180)) for _ in range(20)]
+
+    for lat, lon in points:
+        for radius_km in (10, 800, 3000, 25000):
+            distances = {city: distance_km(lat, lon, city.lat, city.lon) for city in cities}
+            expected = sorted((city for city in cities if distances[city] <= radius_km),
+                              key=distances.get)
+            assert index.within_radius(lat, lon, radius_km) == expected
+
+
+@pytest.mark.parametrize('bbox', [
+    (30, -10, 60, 40),
+    (-50, 160, -10, -150),  # crossing the antimeridian
+    (-80, -170, 80, 100),  # wider than a hemisphere
+    (-90, -180, 90, 180),
+])
+def test_within_bbox_matches_brute_force(bbox: tuple) -> None:
+    cities = random_cities(2000)
+    index = CityIndex.from_cities(cities)
+    center = bbox_center(*bbox)
+
+    expected = sorted((city for city in cities if _in_bbox(city, *bbox)),
+                      key=lambda city: distance_km(*center, city.lat, city.lon))
+    assert index.within_bbox(*bbox) == expected
+
+
+def test_bbox_center() -> None:
+    assert bbox_center(30, -10, 60, 40) == (45, 15)
+    assert bbox_center(-50, 160, -10, -150) == (-30, -175)
+    with pytest.raises(ValueError):
+        CityIndex.from_cities(CITIES).within_bbox(60, 0, 30, 10)
+
+
+def test_find_by_name() -> None:
+    index = CityIndex.from_cities(CITIES)
+
+    assert [city.country for city in index.find('london')] == ['CA', 'GB']
+    assert index.find('London', 'gb') == [CITIES[0]]
+    assert index.find('ZURICH') == [CITIES[3]]
+    assert index.find('Lond') == []
+    assert index.get(293397) == CITIES[4]
+    assert index.get(1) is None
+
+
+def test_saved_index_mapped(tmp_path) -> None:
+    path = str(tmp_path / 'cities.idx')
+    CityIndex.from_cities(CITIES).save(path)
+    index = CityIndex.open(path)
+
+    assert len(index) == 6
+    assert index.find('tel aviv') == [CITIES[4]]
+    assert index.nearest(47, 8) == [CITIES[3]]
+
+
+def test_index_of_city_list(tmp_path) -> None:
+    path = tmp_path / 'city.list.json.gz'
+    with gzip.open(path, 'wt') as f:
+        json.dump([{'id': city.id, 'name': city.name, 'state': '', 'country': city.country,
+                    'coord': {'lon': city.lon, 'lat': city.lat}} for city in CITIES], f)
+
+    index = CityIndex.from_city_list(str(path))
+    assert index.get(2657896) == CITIES[3]
+
+
+def test_not_an_index() -> None:
+    with pytest.raises(ValueError):
+        CityIndex(b'\0' * 64)
+
+
+def test_client_lookups() -> None:
+    routes = {
+        'weather': lambda query: (200, OpenWeatherResponseRainy().json()),
+        'group': group_route(OpenWeatherResponseGroup().json()['list'][0]),
+    }
+    with StubOpenWeatherServer(routes) as server:
+        with OpenWeatherClient(base_url=server.base_url,
+                               city_index=CityIndex.from_cities(CITIES)) as client:
+            client.get_forecast_by_coordinates(51.3, 0.4)
+            client.get_forecast_by_name('london', 'CA')
+            group = client.get_forecast_by_coordinates(42, -75, ForecastType.MULTIPLE, count=2)
+            with pytest.raises(UnknownCity):
+                client.get_forecast_by_name('Atlantis')
+
+    assert list(group) == ['city 4930956', 'city 6058560']
+    assert [query['id'] for _, query in server.requests] == \
+        ['2643743', '6058560', '4930956,6058560']
+
+
+def test_client_without_index() -> None:
+    with pytest.raises(ValueError):
+        OpenWeatherClient().get_forecast_by_name('London')
+
+
+def test_region_forecasts_by_distance() -> None:
+    route = group_route(OpenWeatherResponseGroup().json()['list'][0])
+    with StubOpenWeatherServer({'group': route}) as server:
+        with OpenWeatherClient(base_url=server.base_url, cache=TTLCache(),
+                               city_index=CityIndex.from_cities(CITIES)) as client:
+            # London GB, Zürich and Tel Aviv
+            first = client.get_forecasts_in_radius(51.5, 0, 3700, chunk_size=2)
+            # overlapping the first one, only Boston and London CA are new
+            second = client.get_forecasts_in_bbox(30, -90, 60, 5, chunk_size=2)
+            limited = client.get_forecasts_in_radius(42, -75, 5000, limit=2)
+
+    assert [forecast.city.name for forecast in first.forecasts] == \
+        ['London', 'Zürich', 'Tel Aviv']
+    assert [round(forecast.distance_km) for forecast in first.forecasts][:2] == [9, 770]
+    assert first.forecasts[1].forecast['city_name'] == 'city 2657896'
+    assert [forecast.city.id for forecast in second.forecasts] == [4930956, 6058560, 2643743]
+    assert [forecast.city.id for forecast in limited.forecasts] == [4930956, 6058560]
+    assert first.failures == second.failures == limited.failures == {}
+    assert sorted(query['id'] for _, query in server.requests) == \
+        ['2643743,2657896', '293397', '4930956,6058560']
+
+
+def test_forecasts_by_id_same_name() -> None:
+    def route(query):
+        cities = [dict(OpenWeatherResponseGroup().json()['list'][0], id=int(c_id),
+                       name='London') for c_id in query['id'].split(',')]
+        return 200, {'cnt': len(cities), 'list': cities}
+
+    with StubOpenWeatherServer({'group': route}) as server:
+        with OpenWeatherClient(base_url=server.base_url,
+                               city_index=CityIndex.from_cities(CITIES)) as client:
+            result = client.get_forecasts_by_id([6058560, 2643743])
+            region = client.get_forecasts_in_radius(0, 0, 1)
+
+    assert list(result.forecasts) == [6058560, 2643743]
+    assert result.failures == {}
+    assert len(server.requests) == 1
+    assert region.forecasts == []
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+import typing
+
+# the modules importing open_weather_api.fetch_weather (and creating a client) must not
+# import, they are imported by the first call that needs them
+DEFERRED = ('requests', 'urllib3', 'asyncio', 'concurrent.futures', 'logging', 'orjson',
+            'prometheus_client', 'open_weather_api.geo', 'open_weather_api.resilience')
+# the cumulative import time of open_weather_api.fetch_weather in microseconds, about
+# 10ms when measured, 180ms when it imported requests, prometheus_client and asyncio
+BUDGET_US = 50000
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    # measure the import from the cached bytecode, like an installed package
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return subprocess.run([sys.executable, *args], env=env, cwd=ROOT, capture_output=True,
+                          text=True, check=True)
+
+
+def imported_modules(code: str) -> typing.Set[str]:
+    script = f'import sys\nbefore = set(sys.modules)\n{code}\n' \
+             'print("\\n".join(set(sys.modules) - before))'
+    return set(run_python('-c', script).stdout.split())
+
+
+def test_heavy_modules_deferred() -> None:
+    modules = imported_modules('from open_weather_api import fetch_weather\n'
+                               'fetch_weather.get_default_client()')
+
+    assert 'open_weather_api.fetch_weather' in modules
+    assert [name for name in modules if name.split('.')[0] in DEFERRED or name in DEFERRED] \
+        == []
+
+
+def test_deferred_modules_imported_on_use() -> None:
+    modules = imported_modules('from open_weather_api import fetch_weather\n'
+                               'fetch_weather.get_default_client()._session')
+
+    assert {'requests', 'urllib3', 'open_weather_api.resilience'} <= modules
+
+
+def test_import_time_budget() -> None:
+    def import_time() -> int:
+        stderr = run_python('-X', 'importtime', '-c', 'import open_weather_api.fetch_weather'
+                            ).stderr
+        for line in stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            _, cumulative, name = line.split('|')
+            if name.strip() == 'open_weather_api.fetch_weather':
+                return int(cumulative)
+        raise AssertionError(stderr)
+
+    # the first run may compile the bytecode, the best of the others is the least noisy
+    assert min(import_time() for _ in range(4)) < BUDGET_US
@@ -0,0 +1,156 @@
+import asyncio
+import typing
+
+import pytest
+
+from open_weather_api.cache import TTLCache
+from open_weather_api.exceptions import NotFound
+from open_weather_api.fetch_weather import ForecastType, OpenWeatherClient, Units
+from open_weather_api.instrumentation import (
+    CACHE_HIT,
+    CACHE_MISS,
+    CallMetrics,
+    Instrumentation,
+    PrometheusInstrumentation,
+)
+from open_weather_api.streaming import stream_city_forecast
+from tests.stub_server import group_route, StubOpenWeatherServer
+from tests.test_fetch_weather import (
+    OpenWeatherResponseDaily,
+    OpenWeatherResponseGroup,
+    OpenWeatherResponseRainy,
+)
+
+
+class RecordingInstrumentation(Instrumentation):
+    def __init__(self) -> None:
+        self.calls = []
+        self.lookups = []
+
+    def on_call(self, call: CallMetrics) -> None:
+        self.calls.append(call)
+
+    def on_cache(self, forecast_type: ForecastType, units: Units, outcome: str) -> None:
+        self.lookups.append((forecast_type, units, outcome))
+
+
+def current_route(query: typing.Dict) -> typing.Tuple[int, typing.Dict]:
+    return 200, OpenWeatherResponseRainy().json()
+
+
+def test_call_phases_recorded() -> None:
+    instrumentation = RecordingInstrumentation()
+    with StubOpenWeatherServer({'weather': current_route}) as server:
+        with OpenWeatherClient(base_url=server.base_url,
+                               instrumentation=instrumentation) as client:
+            client.get_city_forecast(2643743, ForecastType.CURRENT, Units.IMPERIAL)
+
+    call, = instrumentation.calls
+    assert call.forecast_type == ForecastType.CURRENT
+    # the calls of every units fetch Units.STANDARD
+    assert call.units == Units.STANDARD
+    assert list(call.phases) == ['response', 'download', 'decode', 'parse']
+    assert all(seconds >= 0 for seconds in call.phases.values())
+    assert call.duration == sum(call.phases.values())
+    assert call.status_code == 200
+    assert call.response_size > 0
+    assert call.retries == 0
+    assert call.error is None
+
+
+def test_failed_call_recorded() -> None:
+    instrumentation = RecordingInstrumentation()
+    with StubOpenWeatherServer({}) as server:
+        with OpenWeatherClient(base_url=server.base_url,
+                               instrumentation=instrumentation) as client:
+            with pytest.raises(NotFound):
+                client.get_city_forecast(2643743, ForecastType.CURRENT)
+
+    call, = instrumentation.calls
+    assert call.status_code == 404
+    assert isinstance(call.error, NotFound)
+    assert 'decode' not in call.phases
+
+
+def test_retries_recorded() -> None:
+    answers = iter([(503, {'cod': 503}), (200, OpenWeatherResponseRainy().json())])
+    instrumentation = RecordingInstrumentation()
+    with StubOpenWeatherServer({'weather': lambda query: next(answers)}) as server:
+        with OpenWeatherClient(base_url=server.base_url, backoff_factor=0,
+                               instrumentation=instrumentation) as client:
+            client.get_city_forecast(2643743, ForecastType.CURRENT)
+
+    assert instrumentation.calls[0].retries == 1
+    assert instrumentation.calls[0].status_code == 200
+
+
+def test_cache_lookups_recorded() -> None:
+    instrumentation = RecordingInstrumentation()
+    route = group_route(OpenWeatherResponseGroup().json()['list'][0])
+    with StubOpenWeatherServer({'group': route}) as server:
+        with OpenWeatherClient(base_url=server.base_url, cache=TTLCache(),
+                               instrumentation=instrumentation) as client:
+            client.get_city_forecast([1, 2], ForecastType.MULTIPLE)
+            client.get_city_forecast([1, 2, 3], ForecastType.MULTIPLE)
+
+    assert [outcome for _, _, outcome in instrumentation.lookups] == \
+        [CACHE_MISS, CACHE_MISS, CACHE_HIT, CACHE_HIT, CACHE_MISS]
+    assert len(instrumentation.calls) == 2
+    assert all(forecast_type == ForecastType.MULTIPLE
+               for forecast_type, _, _ in instrumentation.lookups)
+
+
+def test_streamed_call_recorded() -> None:
+    instrumentation = RecordingInstrumentation()
+    route = group_route(OpenWeatherResponseGroup().json()['list'][0])
+    with StubOpenWeatherServer({'group': route}) as server:
+        with OpenWeatherClient(base_url=server.base_url,
+                               instrumentation=instrumentation) as client:
+            cities = list(stream_city_forecast(list(range(5)), client=client, chunk_size=64))
+
+    call, = instrumentation.calls
+    assert len(cities) == 5
+    assert list(call.phases) == ['response', 'download']
+    assert call.response_size > 64
+
+
+def test_async_call_recorded() -> None:
+    pytest.importorskip('aiohttp')
+    from open_weather_api.async_client import AsyncOpenWeatherClient
+
+    instrumentation = RecordingInstrumentation()
+
+    async def fetch(base_url):
+        async with AsyncOpenWeatherClient(base_url=base_url,
+                                          instrumentation=instrumentation) as client:
+            await client.get_daily(2643743)
+
+    route = {'forecast/daily': lambda query: (200, OpenWeatherResponseDaily().json())}
+    with StubOpenWeatherServer(route) as server:
+        asyncio.run(fetch(server.base_url))
+
+    call, = instrumentation.calls
+    assert call.forecast_type == ForecastType.DAILY_16
+    assert list(call.phases) == ['queue', 'response', 'download', 'decode', 'parse']
+    assert call.status_code == 200
+
+
+def test_prometheus_metrics() -> None:
+    prometheus_client = pytest.importorskip('prometheus_client')
+    registry = prometheus_client.CollectorRegistry()
+    with StubOpenWeatherServer({'weather': current_route}) as server:
+        with OpenWeatherClient(base_url=server.base_url, cache=TTLCache(),
+                               instrumentation=PrometheusInstrumentation(registry)) as client:
+            client.get_city_forecast(2643743, ForecastType.CURRENT)
+            client.get_city_forecast(2643743, ForecastType.CURRENT)
+
+    labels = {'forecast_type': 'CURRENT', 'units': 'STANDARD'}
+    assert registry.get_sample_value('open_weather_upstream_calls_total',
+                                     dict(labels, status='200')) == 1
+    assert registry.get_sample_value('open_weather_upstream_phase_seconds_count',
+                                     dict(labels, phase='parse')) == 1
+    assert registry.get_sample_value('open_weather_upstream_response_bytes_count', labels) == 1
+    assert registry.get_sample_value('open_weather_cache_lookups_total',
+                                     dict(labels, outcome='hit')) == 1
+    assert registry.get_sample_value('open_weather_cache_lookups_total',
+                                     dict(labels, outcome='miss')) == 1
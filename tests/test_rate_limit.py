@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+from pytest_mock import MockerFixture
+
+from open_weather_api.cache import TTLCache
+from open_weather_api.exceptions import QuotaExceeded, RateLimitExceeded
+from open_weather_api.fetch_weather import ForecastType, OpenWeatherClient
+from open_weather_api.rate_limit import Priority, RateLimiter
+from tests.test_fetch_weather import OpenWeatherResponseRainy
+
+
+def test_rate_limiter_burst_and_shed() -> None:
+    limiter = RateLimiter(calls_per_minute=60, burst=3)
+    for _ in range(3):
+        limiter.acquire(Priority.LOW)
+
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire(Priority.LOW)
+    assert limiter.state.tokens < 1
+    assert limiter.state.waiting == 0
+
+
+def test_rate_limiter_waits_for_refill() -> None:
+    limiter = RateLimiter(calls_per_minute=1200, burst=1)
+    start = time.monotonic()
+    limiter.acquire()
+    limiter.acquire()
+
+    assert time.monotonic() - start >= 0.04
+
+
+def test_rate_limiter_serves_by_priority() -> None:
+    limiter = RateLimiter(calls_per_minute=600, burst=1)
+    limiter.acquire()
+    served = []
+
+    def take(priority):
+        limiter.acquire(priority)
+        served.append(priority)
+
+    threads = [threading.Thread(target=take, args=(Priority.NORMAL,)),
+               threading.Thread(target=take, args=(Priority.HIGH,))]
+    threads[0].start()
+    while limiter.state.waiting < 1:
+        time.sleep(0.001)
+    threads[1].start()
+    for thread in threads:
+        thread.join()
+
+    assert served == [Priority.HIGH, Priority.NORMAL]
+
+
+def test_rate_limiter_monthly_quota() -> None:
+    limiter = RateLimiter(calls_per_minute=600, monthly_quota=2)
+    limiter.acquire()
+    limiter.acquire()
+
+    with pytest.raises(QuotaExceeded):
+        limiter.acquire()
+    assert limiter.state.month_remaining == 0
+
+
+def test_client_rate_limited_falls_back_to_cache(mocker: MockerFixture) -> None:
+    requests_mock = mocker.patch('requests.Session.get')
+    requests_mock.return_value = OpenWeatherResponseRainy()
+    client = OpenWeatherClient(cache=TTLCache(),
+                               rate_limiter=RateLimiter(calls_per_minute=60, burst=1))
+
+    forecast = client.get_city_forecast(2643743, ForecastType.CURRENT)
+    with pytest.raises(RateLimitExceeded):
+        client.get_city_forecast(2643743, ForecastType.CURRENT, use_cache=False,
+                                 priority=Priority.LOW)
+
+    assert client.get_cached_forecast(2643743, ForecastType.CURRENT) == forecast
+    assert client.get_cached_forecast([2643743], ForecastType.MULTIPLE)['London']['city_name'] \
+        == 'London'
+    assert requests_mock.call_count == 1
@@ -0,0 +1,78 @@
+import datetime
+import pickle
+
+import pytest
+
+from open_weather_api.fetch_weather import (
+    _parse_forecast_current,
+    _parse_forecast_daily,
+    _parse_forecast_group,
+)
+from open_weather_api.records import CityForecasts, CurrentForecast, DailyForecast, to_dicts
+from tests.test_fetch_weather import (
+    OpenWeatherResponseDaily,
+    OpenWeatherResponseGroup,
+    OpenWeatherResponseRainy,
+)
+
+
+def test_current_record_dict_view() -> None:
+    forecast = _parse_forecast_current(OpenWeatherResponseRainy().json())
+
+    assert isinstance(forecast, CurrentForecast)
+    assert forecast.dt == 1602519816
+    assert forecast['forecast_time'] == datetime.datetime(2020, 10, 12, 16, 23, 36,
+                                                          tzinfo=datetime.timezone.utc)
+    assert list(forecast)[-5:] == ['forecast_time', 'sunrise_time', 'sunset_time',
+                                   'rain', 'snow']
+    assert forecast.get('missing') is None
+    assert type(forecast.to_dict()) is dict
+    assert forecast.to_dict() == forecast
+
+
+def test_group_record_leaves_out_precipitation() -> None:
+    forecasts = _parse_forecast_group(OpenWeatherResponseGroup().json())
+
+    assert 'rain' not in forecasts['London']
+    assert len(forecasts['London']) == 16
+    with pytest.raises(KeyError):
+        forecasts['London']['snow']
+    assert forecasts['London']._replace(rain=0.1, snow=0)['rain'] == 0.1
+
+
+def test_daily_record() -> None:
+    forecast = _parse_forecast_daily(OpenWeatherResponseDaily().json())
+
+    assert isinstance(forecast, CityForecasts)
+    assert all(isinstance(day, DailyForecast) for day in forecast.forecasts)
+    assert forecast.forecasts[6]['snow'] == 0.3
+    assert type(forecast.to_dict()['forecasts'][0]) is dict
+    assert forecast.to_dict()['forecasts'] == [dict(day) for day in forecast.forecasts]
+
+
+def test_record_read_only() -> None:
+    forecast = _parse_forecast_current(OpenWeatherResponseRainy().json())
+    changed = forecast._replace(current_temp=-99)
+
+    with pytest.raises(AttributeError):
+        forecast.current_temp = -99
+    with pytest.raises(AttributeError):
+        del changed.rain
+    assert type(changed) is CurrentForecast
+    assert forecast.current_temp != changed.current_temp == -99
+
+
+def test_record_picklable() -> None:
+    forecast = _parse_forecast_daily(OpenWeatherResponseDaily().json())
+
+    assert pickle.loads(pickle.dumps(forecast)) == forecast
+
+
+def test_records_to_dicts() -> None:
+    forecasts = _parse_forecast_group(OpenWeatherResponseGroup().json())
+    dicts = to_dicts(forecasts.values())
+
+    assert dicts == [dict(forecast) for forecast in forecasts.values()]
+    assert dicts[0]['sunset_time'] == datetime.datetime.fromtimestamp(
+        forecasts['London'].sunset, tz=datetime.timezone.utc)
+    assert all(type(value) is dict for value in dicts)
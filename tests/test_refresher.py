@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from open_weather_api.cache import TTLCache
+from open_weather_api.fetch_weather import ForecastType, OpenWeatherClient
+from open_weather_api.refresher import HotCityRefresher
+from tests.stub_server import group_route, StubOpenWeatherServer
+from tests.test_cache import FakeClock
+from tests.test_fetch_weather import OpenWeatherResponseDaily, OpenWeatherResponseGroup
+
+ROUTES = {
+    'group': group_route(OpenWeatherResponseGroup().json()['list'][0]),
+    'weather': lambda query: (200, OpenWeatherResponseGroup().json()['list'][0]),
+    'forecast/daily': lambda query: (200, OpenWeatherResponseDaily().json()),
+}
+
+
+def test_refresher_spreads_refreshes() -> None:
+    clock = FakeClock()
+    cache = TTLCache(ttls={ForecastType.MULTIPLE: 100, ForecastType.DAILY_16: 1000}, clock=clock)
+    with StubOpenWeatherServer(ROUTES) as server:
+        client = OpenWeatherClient(base_url=server.base_url, cache=cache)
+        refresher = HotCityRefresher(client, range(1, 61), clock=clock)
+
+        ran = []
+        for _ in range(80):
+            ran.append(refresher.run_pending())
+            clock.now += 1
+
+    # 3 group chunks spread over 80 seconds and 60 daily cities over 800 seconds
+    paths = [path for path, _ in server.requests]
+    assert (paths.count('group'), paths.count('forecast/daily')) == (3, 6)
+    assert max(ran) == 2
+
+
+def test_refresher_keeps_foreground_calls_off_the_network() -> None:
+    clock = FakeClock()
+    cache = TTLCache(ttls={ForecastType.MULTIPLE: 100, ForecastType.DAILY_16: 1000}, clock=clock)
+    with StubOpenWeatherServer(ROUTES) as server:
+        client = OpenWeatherClient(base_url=server.base_url, cache=cache)
+        refresher = HotCityRefresher(client, [1, 2, 3], clock=clock)
+        for _ in range(40):
+            refresher.run_pending()
+            clock.now += 10
+
+        requests = len(server.requests)
+        client.get_city_forecast([3, 1], ForecastType.MULTIPLE)
+        client.get_forecasts_by_id([2])
+        client.get_city_forecast(1, ForecastType.DAILY_16)
+        assert len(server.requests) == requests
+        # the group answers don't report rain and snow, which the current weather has
+        client.get_city_forecast(2, ForecastType.CURRENT)
+
+    assert [path for path, _ in server.requests[requests:]] == ['weather']
+
+
+def test_refresher_background_thread() -> None:
+    with StubOpenWeatherServer(ROUTES) as server:
+        client = OpenWeatherClient(base_url=server.base_url, cache=TTLCache())
+        with HotCityRefresher(client, [1, 2], daily=False, current_interval=0.05):
+            while len(server.requests) < 3:
+                time.sleep(0.001)
+
+    assert client.get_city_forecast([1, 2], ForecastType.MULTIPLE)
+
+
+def test_refresher_needs_cache() -> None:
+    with pytest.raises(ValueError):
+        HotCityRefresher(OpenWeatherClient(), [1])
@@ -0,0 +1,124 @@
+import time
+
+import pytest
+import requests
+
+from open_weather_api.cache import TTLCache
+from open_weather_api.exceptions import CircuitOpenError, UpstreamError
+from open_weather_api.fetch_weather import ForecastType, OpenWeatherClient
+from open_weather_api.resilience import CircuitBreaker, CircuitState, JitteredRetry
+from tests.stub_server import StubOpenWeatherServer
+from tests.test_cache import FakeClock
+from tests.test_fetch_weather import OpenWeatherResponseRainy
+
+
+def test_jittered_backoff_within_exponential_backoff() -> None:
+    retry = JitteredRetry(total=5, backoff_factor=1).increment().increment().increment()
+    backoffs = [retry.get_backoff_time() for _ in range(200)]
+    assert all(0 <= backoff <= 4 for backoff in backoffs)
+    assert len(set(backoffs)) > 1
+    assert isinstance(retry, JitteredRetry)
+
+
+def test_retry_after_respected() -> None:
+    answers = iter([(429, {'cod': 429}, {'Retry-After': '1'}),
+                    (200, OpenWeatherResponseRainy().json())])
+    times = []
+
+    def route(query):
+        times.append(time.monotonic())
+        return next(answers)
+
+    with StubOpenWeatherServer({'weather': route}) as server:
+        with OpenWeatherClient(base_url=server.base_url, backoff_factor=0) as client:
+            forecast = client.get_city_forecast(2643743, ForecastType.CURRENT)
+
+    assert forecast['rain'] == 0.47
+    assert len(times) == 2
+    assert times[1] - times[0] >= 1
+
+
+def test_read_timeout() -> None:
+    def slow_route(query):
+        time.sleep(0.5)
+        return 200, OpenWeatherResponseRainy().json()
+
+    with StubOpenWeatherServer({'weather': slow_route}) as server:
+        with OpenWeatherClient(base_url=server.base_url, max_retries=0,
+                               read_timeout=0.05) as client:
+            start = time.monotonic()
+            with pytest.raises(requests.RequestException):
+                client.get_city_forecast(2643743, ForecastType.CURRENT)
+            assert time.monotonic() - start < 0.4
+
+
+def test_circuit_breaker_opens_and_recovers() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.acquire()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    clock.now += 10
+    breaker.acquire()
+    assert breaker.state == CircuitState.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    clock.now += 10
+    breaker.acquire()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    breaker.acquire()
+
+
+def test_half_open_trial_without_result_retried() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now += 10
+    breaker.acquire()
+    clock.now += 10
+    breaker.acquire()
+    assert breaker.state == CircuitState.HALF_OPEN
+
+
+def test_client_fails_fast_when_open() -> None:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    with StubOpenWeatherServer({'weather': lambda query: (500, {'cod': 500})}) as server:
+        with OpenWeatherClient(base_url=server.base_url, max_retries=0,
+                               circuit_breaker=breaker) as client:
+            for _ in range(2):
+                with pytest.raises(UpstreamError):
+                    client.get_city_forecast(2643743, ForecastType.CURRENT)
+            with pytest.raises(CircuitOpenError):
+                client.get_city_forecast(2643743, ForecastType.CURRENT)
+
+    assert len(server.requests) == 2
+
+
+def test_client_serves_cache_when_open() -> None:
+    clock = FakeClock()
+    answers = iter([(200, OpenWeatherResponseRainy().json()), (503, {'cod': 503})])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    with StubOpenWeatherServer({'weather': lambda query: next(answers)}) as server:
+        with OpenWeatherClient(base_url=server.base_url, max_retries=0,
+                               cache=TTLCache(ttls={ForecastType.CURRENT: 10}, clock=clock),
+                               circuit_breaker=breaker, serve_cached_when_open=True) as client:
+            cached = client.get_city_forecast(2643743, ForecastType.CURRENT)
+            clock.now += 20
+            with pytest.raises(UpstreamError):
+                client.get_city_forecast(2643743, ForecastType.CURRENT)
+            assert client.get_city_forecast(2643743, ForecastType.CURRENT) == cached
+            with pytest.raises(CircuitOpenError):
+                client.get_city_forecast(1, ForecastType.CURRENT)
+
+    assert len(server.requests) == 2
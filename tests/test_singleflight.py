@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pytest_mock import MockerFixture
+
+from open_weather_api.fetch_weather import ForecastType, OpenWeatherClient
+from open_weather_api.singleflight import AsyncSingleFlight, SingleFlight
+from tests.test_fetch_weather import OpenWeatherResponseRainy
+
+
+def test_single_flight_shares_result() -> None:
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow_call(value):
+        calls.append(value)
+        release.wait(1)
+        return {'value': value}
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(flights.do, 'key', slow_call, 1) for _ in range(5)]
+        while flights.coalesced < 4:
+            time.sleep(0.001)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert calls == [1]
+    assert all(result is results[0] for result in results)
+    assert flights.coalesced == 4
+
+
+def test_single_flight_shares_exception() -> None:
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def failing_call():
+        release.wait(1)
+        raise KeyError('cod')
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(flights.do, 'key', failing_call) for _ in range(3)]
+        while flights.coalesced < 2:
+            time.sleep(0.001)
+        release.set()
+        for future in futures:
+            with pytest.raises(KeyError):
+                future.result()
+
+    assert flights.do('key', lambda: 'again') == 'again'
+
+
+def test_async_single_flight_shares_result() -> None:
+    calls = []
+
+    async def slow_call(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return {'value': value}
+
+    async def run():
+        flights = AsyncSingleFlight()
+        results = await asyncio.gather(*(flights.do('key', slow_call, 1) for _ in range(5)))
+        return flights, results
+
+    flights, results = asyncio.run(run())
+
+    assert calls == [1]
+    assert all(result is results[0] for result in results)
+    assert flights.coalesced == 4
+
+
+def test_client_coalesces_identical_calls(mocker: MockerFixture) -> None:
+    release = threading.Event()
+
+    def slow_get(*args, **kwargs):
+        release.wait(1)
+        return OpenWeatherResponseRainy()
+
+    requests_mock = mocker.patch('requests.Session.get', side_effect=slow_get)
+    client = OpenWeatherClient()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(client.get_city_forecast, 2643743, ForecastType.CURRENT)
+                   for _ in range(4)]
+        while client.coalesced < 3:
+            time.sleep(0.001)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert requests_mock.call_count == 1
+    assert all(result == results[0] for result in results)
@@ -0,0 +1,90 @@
+import threading
+
+from pytest_mock import MockerFixture
+
+from open_weather_api.cache import TTLCache
+from open_weather_api.fetch_weather import ForecastType, OpenWeatherClient
+from tests.stub_server import group_route, StubOpenWeatherServer
+from tests.test_cache import FakeClock
+from tests.test_fetch_weather import (
+    OpenWeatherResponseGroup,
+    OpenWeatherResponseRainy,
+    OpenWeatherResponseSnow,
+)
+
+
+def test_stale_forecast_served_and_refreshed(mocker: MockerFixture) -> None:
+    refreshed = threading.Event()
+    responses = iter([OpenWeatherResponseRainy(), OpenWeatherResponseSnow()])
+
+    def get(*args, **kwargs):
+        response = next(responses)
+        if isinstance(response, OpenWeatherResponseSnow):
+            refreshed.set()
+        return response
+
+    requests_mock = mocker.patch('requests.Session.get', side_effect=get)
+    clock = FakeClock()
+    client = OpenWeatherClient(cache=TTLCache(ttls={ForecastType.CURRENT: 60}, clock=clock),
+                               max_staleness=30)
+
+    first = client.get_city_forecast(2643743, ForecastType.CURRENT)
+    clock.now += 70
+    stale = client.get_city_forecast(2643743, ForecastType.CURRENT)
+    refreshed.wait(1)
+    client.close()
+    fresh = client.get_city_forecast(2643743, ForecastType.CURRENT)
+
+    assert stale == first
+    assert fresh['snow'] == 0.47
+    assert requests_mock.call_count == 2
+
+
+def test_stale_forecast_beyond_limits_is_fetched(mocker: MockerFixture) -> None:
+    requests_mock = mocker.patch('requests.Session.get')
+    requests_mock.return_value = OpenWeatherResponseRainy()
+    clock = FakeClock()
+    client = OpenWeatherClient(cache=TTLCache(ttls={ForecastType.CURRENT: 60}, clock=clock),
+                               max_staleness=30, hard_expiry=80)
+
+    client.get_city_forecast(2643743, ForecastType.CURRENT)
+    clock.now += 95
+    client.get_city_forecast(2643743, ForecastType.CURRENT)
+    clock.now += 85
+    client.get_city_forecast(2643743, ForecastType.CURRENT)
+
+    assert requests_mock.call_count == 3
+    assert client.get_cached_forecast(2643743, ForecastType.CURRENT) is not None
+    clock.now += 80
+    assert client.get_cached_forecast(2643743, ForecastType.CURRENT) is None
+
+
+def test_hard_expiry_below_ttl(mocker: MockerFixture) -> None:
+    requests_mock = mocker.patch('requests.Session.get')
+    requests_mock.return_value = OpenWeatherResponseRainy()
+    clock = FakeClock()
+    client = OpenWeatherClient(cache=TTLCache(ttls={ForecastType.CURRENT: 600}, clock=clock),
+                               hard_expiry=60)
+
+    client.get_city_forecast(2643743, ForecastType.CURRENT)
+    clock.now += 30
+    client.get_city_forecast(2643743, ForecastType.CURRENT)
+    clock.now += 40
+    client.get_city_forecast(2643743, ForecastType.CURRENT)
+
+    assert requests_mock.call_count == 2
+
+
+def test_stale_group_cities_refreshed_in_background() -> None:
+    clock = FakeClock()
+    route = group_route(OpenWeatherResponseGroup().json()['list'][0])
+    with StubOpenWeatherServer({'group': route}) as server:
+        client = OpenWeatherClient(base_url=server.base_url, max_staleness=30,
+                                   cache=TTLCache(ttls={ForecastType.MULTIPLE: 60}, clock=clock))
+        client.get_city_forecast([1, 2], ForecastType.MULTIPLE)
+        clock.now += 70
+        result = client.get_city_forecast([1, 2, 3], ForecastType.MULTIPLE)
+        client.close()
+
+    assert list(result) == ['city 1', 'city 2', 'city 3']
+    assert sorted(query['id'] for _, query in server.requests) == ['1,2', '1,2', '3']
@@ -0,0 +1,110 @@
+import json
+import threading
+import typing
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from open_weather_api.fetch_weather import (
+    _parse_forecast_daily,
+    _parse_forecast_group,
+    ForecastType,
+    OpenWeatherClient,
+)
+from open_weather_api.streaming import (
+    iter_daily_forecasts,
+    iter_group_forecasts,
+    stream_city_forecast,
+)
+from tests.stub_server import group_route, StubOpenWeatherServer
+from tests.test_fetch_weather import OpenWeatherResponseDaily, OpenWeatherResponseGroup
+
+
+def _chunks(data: bytes, size: int) -> list:
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 64, 100000])
+def test_stream_group(chunk_size: int) -> None:
+    payload = OpenWeatherResponseGroup().json()
+    # keys and strings that look like the structure must not confuse the scanner
+    payload['list'][0]['weather'][0]['description'] = 'light "rain" {[\\'
+    payload = dict({'message': 'list', 'extra': {'list': [{'id': 1}]}}, **payload)
+    data = json.dumps(payload).encode()
+
+    forecasts = list(iter_group_forecasts(_chunks(data, chunk_size)))
+
+    assert {forecast.city_name: forecast for forecast in forecasts} == \
+        _parse_forecast_group(payload)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 4096])
+def test_stream_daily(chunk_size: int) -> None:
+    payload = OpenWeatherResponseDaily().json()
+    data = json.dumps(payload, indent=2).encode()
+
+    forecasts = list(iter_daily_forecasts(_chunks(data, chunk_size)))
+
+    assert forecasts == _parse_forecast_daily(payload)['forecasts']
+
+
+def test_stream_city_forecast() -> None:
+    route = group_route(OpenWeatherResponseGroup().json()['list'][0])
+    with StubOpenWeatherServer({'group': route}) as server:
+        client = OpenWeatherClient(base_url=server.base_url)
+        forecasts = stream_city_forecast(list(range(50)), ForecastType.MULTIPLE,
+                                         client=client, chunk_size=256)
+        first = next(forecasts)
+        names = [first.city_name] + [forecast.city_name for forecast in forecasts]
+
+    assert names == [f'city {c_id}' for c_id in range(50)]
+
+
+def test_stream_doesnt_read_the_whole_answer(mocker: MockerFixture) -> None:
+    route = group_route(OpenWeatherResponseGroup().json()['list'][0])
+    get = mocker.spy(requests.Session, 'get')
+    with StubOpenWeatherServer({'group': route}) as server:
+        with OpenWeatherClient(base_url=server.base_url) as client:
+            forecasts = stream_city_forecast(list(range(2000)), ForecastType.MULTIPLE,
+                                             client=client, chunk_size=1024)
+            first = next(forecasts)
+            response = get.spy_return
+            consumed = response._content_consumed
+            rest = list(forecasts)
+
+    assert first.city_name == 'city 0'
+    assert not consumed
+    assert len(rest) == 1999
+
+
+def test_stream_first_forecast_before_the_answer_ends() -> None:
+    payload = OpenWeatherResponseGroup().json()
+    data = json.dumps(payload).encode()
+    first_city = json.dumps(payload['list'][0]).encode()
+    end_of_first_city = data.index(first_city) + len(first_city)
+    # the rest of the answer is sent only after the first forecast got to the client
+    first_read, rest_sent = threading.Event(), threading.Event()
+
+    def slow_body() -> typing.Iterator[bytes]:
+        yield data[:end_of_first_city]
+        first_read.wait(2)
+        rest_sent.set()
+        yield data[end_of_first_city:]
+
+    with StubOpenWeatherServer({'group': lambda query: (200, slow_body())}) as server:
+        with OpenWeatherClient(base_url=server.base_url) as client:
+            forecasts = stream_city_forecast([1, 2], ForecastType.MULTIPLE, client=client)
+            first = next(forecasts)
+            arrived_first = not rest_sent.is_set()
+            first_read.set()
+            rest = list(forecasts)
+
+    assert arrived_first
+    assert [first.city_name] + [forecast.city_name for forecast in rest] == \
+        [city['name'] for city in payload['list']]
+
+
+def test_stream_current_not_supported() -> None:
+    with pytest.raises(ValueError):
+        stream_city_forecast(2643743, ForecastType.CURRENT)